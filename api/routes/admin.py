@@ -10,10 +10,9 @@ from fastapi import APIRouter, HTTPException, Query
 from database.db import (
     get_platform_stats, get_all_drivers, get_all_riders,
     get_completed_rides, get_cancelled_rides, get_pending_drivers,
-    update_driver_status, get_driver, get_rider,
-    get_active_ride_for_user, get_ride,
+    update_driver_status, get_driver, get_rider, get_ride,
 )
-from enums import DriverStatus, RideStatus
+from enums import DriverStatus
 from services.ai_support import generate_driver_insights, generate_demand_forecast
 from api.schemas import (
     DriverResponse, RiderResponse, RideResponse, PlatformStats, DriverVerifyRequest
@@ -133,7 +132,8 @@ async def api_get_rides(
 @router.get("/rides/{ride_id}", response_model=RideResponse)
 async def api_get_ride(ride_id: int):
     """Get a specific ride by ID."""
-    ride = await get_ride(ride_id)
+    # Ride transitions happen in the bot process, which can't invalidate this process's cache
+    ride = await get_ride(ride_id, cached=False)
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
     
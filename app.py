@@ -8,11 +8,16 @@ Author: Portfolio Project
 License: MIT
 """
 import asyncio
+from typing import Any, Awaitable
 from telegram import Update
-from telegram.ext import Application, ContextTypes
+from telegram.ext import AIORateLimiter, Application, ContextTypes, SimpleUpdateProcessor
 
-from config import BOT_TOKEN, IS_PRODUCTION, WEBHOOK_URL, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT
-from database.db import init_db
+from config import (
+    BOT_TOKEN, IS_PRODUCTION, WEBHOOK_URL, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT,
+    POLL_TIMEOUT, POLL_READ_TIMEOUT, TELEGRAM_POOL_SIZE, TELEGRAM_POOL_TIMEOUT
+)
+from database.db import init_db, update_scope
+from services.outbox import outbox
 from handlers.start import setup_start_handlers
 from handlers.driver import setup_driver_handlers
 from handlers.rider import setup_rider_handlers
@@ -20,6 +25,24 @@ from handlers.admin import setup_admin_handlers
 from handlers.support import setup_support_handlers
 from utils.logger import logger
 
+try:
+    import uvloop
+except ImportError:  # uvloop is unavailable on Windows; fall back to the stock loop
+    uvloop = None
+
+try:
+    import aiolimiter  # backs AIORateLimiter (python-telegram-bot[rate-limiter])
+except ImportError:
+    aiolimiter = None
+
+
+class DatabaseScopedUpdateProcessor(SimpleUpdateProcessor):
+    """Process each update inside one database scope, so its DB helpers share a connection."""
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        async with update_scope():
+            await coroutine
+
 
 async def post_init(application: Application):
     """Initialize database after application starts."""
@@ -27,12 +50,49 @@ async def post_init(application: Application):
     logger.info("Bot initialized successfully")
 
 
+async def post_stop(application: Application):
+    """Deliver queued notifications while the bot can still send them."""
+    await outbox.flush(timeout=10)
+
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Log unhandled exceptions and let the user know something went wrong."""
+    logger.error("Exception while handling an update:", exc_info=context.error)
+    if isinstance(update, Update) and update.effective_message:
+        await update.effective_message.reply_text(
+            "❌ <b>An internal error occurred.</b>\n"
+            "The development team has been notified. Please try again later.",
+            parse_mode="HTML"
+        )
+
+
 def main():
     """Main function to run the bot."""
     logger.info("Starting RideShare Bot...")
     
+    # PTB creates its loop via asyncio.get_event_loop(), so set the policy before running
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+    
     # Create application
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .get_updates_read_timeout(POLL_READ_TIMEOUT)
+        .connection_pool_size(TELEGRAM_POOL_SIZE)
+        .pool_timeout(TELEGRAM_POOL_TIMEOUT)
+        .concurrent_updates(DatabaseScopedUpdateProcessor(1))  # still one update at a time
+        .post_init(post_init)
+        .post_stop(post_stop)
+    )
+    if aiolimiter is not None:
+        # Queue Bot API calls under Telegram's flood limits and retry 429s
+        # instead of failing the handler mid-update
+        builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+    else:
+        logger.warning("aiolimiter not installed; Bot API calls are not rate limited")
+    application = builder.build()
     
     # Register all handlers
     setup_start_handlers(application)
@@ -42,15 +102,6 @@ def main():
     setup_support_handlers(application)
     
     # Add error handler
-    async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
-        logger.error("Exception while handling an update:", exc_info=context.error)
-        if isinstance(update, Update) and update.effective_message:
-            await update.effective_message.reply_text(
-                "❌ <b>An internal error occurred.</b>\n"
-                "The development team has been notified. Please try again later.",
-                parse_mode="HTML"
-            )
-
     application.add_error_handler(error_handler)
     
     logger.info("All handlers registered")
@@ -73,7 +124,11 @@ def main():
         logger.info("Running in DEVELOPMENT mode with long polling")
         
         # Start polling (this handles the event loop internally)
-        application.run_polling(allowed_updates=["message", "callback_query"])
+        application.run_polling(
+            allowed_updates=["message", "callback_query"],
+            timeout=POLL_TIMEOUT,
+            drop_pending_updates=True
+        )
 
 
 if __name__ == "__main__":
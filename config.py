@@ -3,7 +3,8 @@ Configuration module for the Rideshare Bot.
 Loads environment variables and provides application settings.
 """
 import os
-from typing import List
+import tempfile
+from typing import FrozenSet
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -16,7 +17,7 @@ if not BOT_TOKEN:
 
 # Admin Configuration
 ADMIN_IDS_STR = os.getenv("ADMIN_IDS", "")
-ADMIN_IDS: List[int] = [int(id.strip()) for id in ADMIN_IDS_STR.split(",") if id.strip()]
+ADMIN_IDS: FrozenSet[int] = frozenset(int(part) for part in map(str.strip, ADMIN_IDS_STR.split(",")) if part)
 
 # Environment
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -27,6 +28,21 @@ WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
 WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
 
+# Long-polling Configuration (development)
+# Telegram holds getUpdates open for POLL_TIMEOUT seconds; PTB adds the read
+# timeout on top, so the socket always outlives the long poll (25 s + 15 s = 40 s).
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "25"))
+POLL_READ_TIMEOUT = 15.0
+
+# Outgoing Bot API connection pool. Handlers fire several calls at once (rider
+# notify + message edit), so give them room and wait longer than PTB's 1 s
+# default for a free connection before raising a pool timeout.
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "256"))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "10"))
+# Background notification sends allowed in flight at once; the rest wait their turn,
+# so a burst of fan-out leaves pool connections free for handler replies
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "64"))
+
 # Railway sets PORT environment variable automatically
 WEBAPP_PORT = int(os.getenv("PORT", os.getenv("WEBAPP_PORT", "8000")))
 
@@ -39,6 +55,28 @@ if DATABASE_URL.startswith("postgres://"):
 elif DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
+# Connection pool sizing (shared by SQLite and PostgreSQL engines)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # seconds
+
+# Per-connection prepared statement cache for asyncpg (set 0 behind a
+# transaction-mode pgbouncer, which can't keep prepared statements)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "200"))
+
+# Lock file that lets only one worker on a host run init_db's migration pass
+# (PostgreSQL deployments use an advisory lock instead)
+MIGRATION_LOCK_FILE = os.getenv("MIGRATION_LOCK_FILE", os.path.join(tempfile.gettempdir(), "rideshare.migrate.lock"))
+
+# How long driver/rider rows may be served from the in-process cache
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds
+# get_ride results are re-read by every ride button press and notification
+RIDE_CACHE_TTL = float(os.getenv("RIDE_CACHE_TTL", "30"))  # seconds
+
+# How long the in-memory available-driver index is trusted before it is reloaded
+# (bounds staleness from writes made by other processes, e.g. the admin API)
+AVAILABLE_DRIVERS_TTL = float(os.getenv("AVAILABLE_DRIVERS_TTL", "30"))  # seconds
+
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
@@ -50,4 +88,6 @@ CITY_LNG_MAX = 38.8
 
 # Business Logic Configuration
 MAX_SEARCH_DISTANCE_KM = 10.0  # Maximum distance to search for drivers
+MATCH_ATTEMPTS = 3  # Nearest candidates tried when a driver is claimed concurrently
 RIDE_TIMEOUT_MINUTES = 30  # Time before ride request expires
+
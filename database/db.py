@@ -1,84 +1,174 @@
 """
 Database connection and operations for the Rideshare Bot.
 """
+import asyncio
 from contextlib import asynccontextmanager
-from typing import Optional, List
+from contextvars import ContextVar
+from typing import Optional, List, Tuple
 from datetime import datetime
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select, and_, or_, text, inspect, func
+from sqlalchemy import select, insert, bindparam, update, delete, union_all, and_, text, inspect, func, event, cast, case, literal, exists, Integer, Numeric
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import selectinload
-
-from config import DATABASE_URL
-from database.models import Base, Driver, Rider, Ride, RideHistory, SavedLocation
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_STATEMENT_CACHE_SIZE,
+    USER_CACHE_TTL, RIDE_CACHE_TTL, MIGRATION_LOCK_FILE, AVAILABLE_DRIVERS_TTL,
+)
+from database.models import Base, Driver, Rider, Ride, RideHistory, SavedLocation, SchemaMeta, RideStatusType
+from database.driver_index import AvailableDriverIndex, DriverPosition, nearest_in_box
 from enums import RideStatus, VehicleType, DriverStatus
-from utils.logger import logger, log_with_context
+from utils.cache import TTLCache
+from utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unguarded migrations
+    fcntl = None
+
+
+def _engine_options(url: str) -> dict:
+    """
+    Pool settings for the async engine.
+    aiosqlite defaults to NullPool for file databases, which reconnects on every
+    session; keep a long-lived pool instead so connections and the page cache stay warm.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # In-memory databases only exist on a single connection
+        return {"poolclass": StaticPool}
+    options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        # A local SQLite file can't drop the connection, so only ping network databases
+        "pool_pre_ping": not url.startswith("sqlite"),
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        # SQLAlchemy's prepared-statement LRU plus asyncpg's own cache, so hot
+        # statements are parsed and planned once per pooled connection
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
 
 # Create async engine
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = create_async_engine(DATABASE_URL, echo=False, **_engine_options(DATABASE_URL))
+
+
+# Per-connection SQLite tuning: WAL lets readers proceed while a writer commits,
+# and synchronous=NORMAL avoids an fsync on every commit in WAL mode.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",  # ~64 MB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA busy_timeout=5000",
+)
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply SQLITE_PRAGMAS once when the pool opens a new connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 
 # Create session factory
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Short-lived caches for user lookups; every writer below invalidates its key
+driver_cache = TTLCache(ttl=USER_CACHE_TTL)
+rider_cache = TTLCache(ttl=USER_CACHE_TTL)
+# get_user_language results; set_user_language invalidates its key
+language_cache = TTLCache(ttl=USER_CACHE_TTL)
+# get_ride results (ride + rider + driver); every ride writer below invalidates its key.
+# Writes made by another process only show up once the entry expires.
+ride_cache = TTLCache(ttl=RIDE_CACHE_TTL)
+
+# Matching reads available drivers from memory; writers below keep it in sync
+available_driver_index = AvailableDriverIndex(ttl=AVAILABLE_DRIVERS_TTL)
+_DRIVER_POSITION_COLUMNS = (Driver.id, Driver.name, Driver.vehicle_type, Driver.latitude, Driver.longitude)
+
+
+# Bump whenever the models or migrate_schema() below change, so existing
+# databases re-run the create/inspect/ALTER pass on their next startup.
+SCHEMA_VERSION = "7"
+
+
+async def get_schema_version() -> Optional[str]:
+    """Read the applied schema version, or None if it was never recorded."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(SchemaMeta.value).where(SchemaMeta.key == "version"))
+            return result.scalar()
+    except Exception:
+        # schema_meta doesn't exist yet (fresh or pre-versioning database)
+        return None
+
+
+# Arbitrary constant identifying this app's migration lock among PostgreSQL advisory locks
+MIGRATION_ADVISORY_LOCK_ID = 7_318_220_641
+
+
+@asynccontextmanager
+async def migration_lock():
+    """
+    Serialize init_db's migration pass across worker processes.
+
+    PostgreSQL uses a session-level advisory lock; SQLite uses an flock on
+    MIGRATION_LOCK_FILE. Whoever loses the race waits for the winner, then
+    re-reads the schema version and normally finds nothing left to do.
+    """
+    if engine.dialect.name == "postgresql":
+        async with engine.connect() as conn:
+            got = (await conn.execute(select(func.pg_try_advisory_lock(MIGRATION_ADVISORY_LOCK_ID)))).scalar()
+            if not got:
+                logger.info("⏳ Another worker is migrating the schema; waiting")
+                await conn.execute(select(func.pg_advisory_lock(MIGRATION_ADVISORY_LOCK_ID)))
+            try:
+                yield
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(MIGRATION_ADVISORY_LOCK_ID)))
+                await conn.commit()
+    elif fcntl is not None:
+        with open(MIGRATION_LOCK_FILE, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("⏳ Another worker is migrating the schema; waiting")
+                await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
 
 async def init_db():
     """Initialize database tables and handle simple migrations."""
     try:
         logger.info(f"💾 Initializing database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}")
         
-        async with engine.begin() as conn:
-            # Create tables if they don't exist
-            await conn.run_sync(Base.metadata.create_all)
-            
-            # Simple migration check for language_code
-            def migrate_schema(sync_conn):
-                inspector = inspect(sync_conn)
-                table_names = inspector.get_table_names()
-                
-                for table in ['drivers', 'riders', 'rides']:
-                    if table in table_names:
-                        columns = [c['name'] for c in inspector.get_columns(table)]
-                        
-                        if table in ['drivers', 'riders']:
-                            if 'language_code' not in columns:
-                                logger.info(f"⚙️ Migrating {table}: adding language_code column")
-                                sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN language_code VARCHAR(5) DEFAULT 'en'"))
-                            if 'phone_number' not in columns:
-                                logger.info(f"⚙️ Migrating {table}: adding phone_number column")
-                                sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN phone_number VARCHAR(20)"))
-                            if 'wallet_balance' not in columns:
-                                logger.info(f"⚙️ Migrating {table}: adding wallet_balance column")
-                                sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN wallet_balance FLOAT DEFAULT 0.0"))
-                                
-                        if table == 'drivers':
-                            if 'status' not in columns:
-                                logger.info(f"⚙️ Migrating drivers: adding status column")
-                                sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN status VARCHAR(20) DEFAULT 'APPROVED'")) # Default approved for existing
-                            if 'plate_number' not in columns:
-                                logger.info(f"⚙️ Migrating drivers: adding plate_number column")
-                                sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN plate_number VARCHAR(20)"))
-                            if 'license_file_id' not in columns:
-                                logger.info(f"⚙️ Migrating drivers: adding license_file_id column")
-                                sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN license_file_id VARCHAR(255)"))
-                        
-                        if table == 'rides':
-                            if 'dest_lat' not in columns:
-                                logger.info(f"⚙️ Migrating rides: adding routing columns")
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN dest_lat FLOAT"))
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN dest_lng FLOAT"))
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN estimated_fare FLOAT"))
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN estimated_duration INTEGER"))
-                            if 'final_fare' not in columns:
-                                logger.info(f"⚙️ Migrating rides: adding payment columns")
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN final_fare FLOAT"))
-                                sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN payment_method VARCHAR(20)"))
-            
-            
-            # We wrap this in another try/except because if it fails, we still want the bot to try and start
-            try:
-                await conn.run_sync(migrate_schema)
-            except Exception as migrate_err:
-                logger.warning(f"⚠️ Schema migration notice (usually okay): {migrate_err}")
+        if await get_schema_version() == SCHEMA_VERSION:
+            logger.info(f"✅ Database schema already at version {SCHEMA_VERSION}")
+            return
+        
+        async with migration_lock():
+            # Re-check under the lock: a worker that waited on the leader finds the work done
+            if await get_schema_version() == SCHEMA_VERSION:
+                logger.info(f"✅ Database schema already ensured at version {SCHEMA_VERSION}")
+                return
+            await _migrate()
             
         logger.info("✅ Database initialization complete")
     except Exception as e:
@@ -87,9 +177,151 @@ async def init_db():
         # but if the DB is truly down, the first query will fail anyway.
 
 
+async def _migrate():
+    """Create missing tables, columns and indexes, then record SCHEMA_VERSION."""
+    async with engine.begin() as conn:
+        # Create tables if they don't exist
+        await conn.run_sync(Base.metadata.create_all)
+        
+        # Simple migration check for language_code
+        def migrate_schema(sync_conn):
+            inspector = inspect(sync_conn)
+            table_names = inspector.get_table_names()
+            
+            for table in ['drivers', 'riders', 'rides']:
+                if table in table_names:
+                    columns = [c['name'] for c in inspector.get_columns(table)]
+                    
+                    if table in ['drivers', 'riders']:
+                        if 'language_code' not in columns:
+                            logger.info(f"⚙️ Migrating {table}: adding language_code column")
+                            sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN language_code VARCHAR(5) DEFAULT 'en'"))
+                        if 'phone_number' not in columns:
+                            logger.info(f"⚙️ Migrating {table}: adding phone_number column")
+                            sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN phone_number VARCHAR(20)"))
+                        if 'wallet_balance' not in columns:
+                            logger.info(f"⚙️ Migrating {table}: adding wallet_balance column")
+                            sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN wallet_balance FLOAT DEFAULT 0.0"))
+                            
+                    if table == 'drivers':
+                        if 'status' not in columns:
+                            logger.info(f"⚙️ Migrating drivers: adding status column")
+                            sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN status VARCHAR(20) DEFAULT 'APPROVED'")) # Default approved for existing
+                        if 'plate_number' not in columns:
+                            logger.info(f"⚙️ Migrating drivers: adding plate_number column")
+                            sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN plate_number VARCHAR(20)"))
+                        if 'license_file_id' not in columns:
+                            logger.info(f"⚙️ Migrating drivers: adding license_file_id column")
+                            sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN license_file_id VARCHAR(255)"))
+                        if 'rating_sum' not in columns:
+                            logger.info(f"⚙️ Migrating drivers: adding rating_sum column")
+                            sync_conn.execute(text(f"ALTER TABLE drivers ADD COLUMN rating_sum INTEGER DEFAULT 0"))
+                            sync_conn.execute(text(f"UPDATE drivers SET rating_sum = ROUND(rating * total_rides)"))
+                    
+                    if table == 'rides':
+                        if 'dest_lat' not in columns:
+                            logger.info(f"⚙️ Migrating rides: adding routing columns")
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN dest_lat FLOAT"))
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN dest_lng FLOAT"))
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN estimated_fare FLOAT"))
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN estimated_duration INTEGER"))
+                        if 'final_fare' not in columns:
+                            logger.info(f"⚙️ Migrating rides: adding payment columns")
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN final_fare FLOAT"))
+                            sync_conn.execute(text(f"ALTER TABLE rides ADD COLUMN payment_method VARCHAR(20)"))
+
+            # RideStatus moved from its name (VARCHAR / native ENUM) to a SMALLINT code
+            to_code = "CASE status " + " ".join(
+                f"WHEN '{status.name}' THEN {code}" for status, code in RideStatusType.CODES.items()
+            ) + " END"
+            dialect = sync_conn.dialect.name
+            for table in ['rides', 'ride_history']:
+                if table not in table_names:
+                    continue
+                if dialect == "sqlite":
+                    if sync_conn.execute(text(f"SELECT 1 FROM {table} WHERE status GLOB '[A-Z]*' LIMIT 1")).first():
+                        logger.info(f"⚙️ Migrating {table}: storing status as SMALLINT codes")
+                        sync_conn.execute(text("DROP INDEX IF EXISTS ix_rides_status_active"))
+                        sync_conn.execute(text(f"UPDATE {table} SET status = {to_code} WHERE status GLOB '[A-Z]*'"))
+                elif dialect == "postgresql":
+                    status_col = next(c for c in inspector.get_columns(table) if c['name'] == 'status')
+                    if not isinstance(status_col['type'], Integer):
+                        logger.info(f"⚙️ Migrating {table}: storing status as SMALLINT codes")
+                        sync_conn.execute(text("DROP INDEX IF EXISTS ix_rides_status_active"))
+                        sync_conn.execute(text(
+                            f"ALTER TABLE {table} ALTER COLUMN status TYPE SMALLINT USING ({to_code.replace('CASE status', 'CASE status::text')})"
+                        ))
+
+            # Replaced by ix_drivers_available once matching moved to the in-memory index
+            sync_conn.execute(text("DROP INDEX IF EXISTS ix_drivers_lat_lng_avail"))
+
+            # create_all() only builds indexes for new tables, so add any missing ones
+            for table in Base.metadata.sorted_tables:
+                if table.name in table_names:
+                    for index in table.indexes:
+                        index.create(sync_conn, checkfirst=True)
+        
+        
+        # We wrap this in another try/except because if it fails, we still want the bot to try and start
+        try:
+            await conn.run_sync(migrate_schema)
+            await conn.execute(delete(SchemaMeta).where(SchemaMeta.key == "version"))
+            await conn.execute(insert(SchemaMeta).values(key="version", value=SCHEMA_VERSION))
+        except Exception as migrate_err:
+            logger.warning(f"⚠️ Schema migration notice (usually okay): {migrate_err}")
+
+
+class _UpdateScope:
+    """One session bound to one pooled connection, shared while handling a single update."""
+    __slots__ = ("session", "busy")
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.busy = False
+
+
+_current_scope: ContextVar[Optional[_UpdateScope]] = ContextVar("db_update_scope", default=None)
+
+
+@asynccontextmanager
+async def update_scope():
+    """
+    Let every DB helper called inside this block reuse one connection checkout.
+    Helpers keep their own commit boundaries; only the connection and session are shared.
+    """
+    async with engine.connect() as conn:
+        async with async_session_maker(bind=conn) as session:
+            token = _current_scope.set(_UpdateScope(session))
+            try:
+                yield
+            finally:
+                _current_scope.reset(token)
+
+
 @asynccontextmanager
 async def get_session():
     """Context manager for database sessions."""
+    scope = _current_scope.get()
+    if scope is not None and not scope.busy:
+        # Reuse the update's session. Nested or concurrent helpers (busy) fall through
+        # to a private session, since an AsyncSession can't run two operations at once.
+        scope.busy = True
+        session = scope.session
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            # Mirror a standalone session's close(): hand back detached objects and
+            # end any read-only transaction so the next helper sees fresh data.
+            session.expunge_all()
+            if session.in_transaction():
+                await session.rollback()
+            scope.busy = False
+        return
+
     async with async_session_maker() as session:
         try:
             yield session
@@ -101,6 +333,46 @@ async def get_session():
             await session.close()
 
 
+# ==================== Prebuilt Statements ====================
+# Hot lookups are built once at import with bound parameters, so each call only
+# hits SQLAlchemy's compiled cache instead of rebuilding the expression tree.
+
+ACTIVE_RIDE_STATUSES = (RideStatus.REQUESTED, RideStatus.ASSIGNED, RideStatus.ONGOING)
+
+_DRIVER_BY_ID = select(Driver).where(Driver.id == bindparam("id"))
+_RIDER_BY_ID = select(Rider).where(Rider.id == bindparam("id"))
+# Language of a user in either role, one round-trip instead of get_rider then get_driver
+_USER_LANGUAGE = union_all(
+    select(Rider.language_code).where(Rider.id == bindparam("id")),
+    select(Driver.language_code).where(Driver.id == bindparam("id")),
+).limit(1)
+_RIDE_BY_ID = select(Ride).where(Ride.id == bindparam("id"))
+_AVAILABLE_DRIVERS = select(*_DRIVER_POSITION_COLUMNS).where(
+    Driver.available == True, Driver.status == DriverStatus.APPROVED
+)
+_RIDER_RIDE_COUNT = select(func.count(Ride.id)).where(Ride.rider_id == bindparam("user_id"))
+_DRIVER_COMPLETED_COUNT = select(func.count(Ride.id)).where(
+    and_(Ride.driver_id == bindparam("driver_id"), Ride.status == RideStatus.COMPLETED)
+)
+_RIDE_WITH_PARTIES_BY_ID = (
+    select(Ride).options(selectinload(Ride.rider), selectinload(Ride.driver))
+    .where(Ride.id == bindparam("id"))
+)
+_ACTIVE_RIDE_FOR_RIDER = (
+    select(Ride).options(selectinload(Ride.rider), selectinload(Ride.driver))
+    .where(Ride.rider_id == bindparam("user_id"), Ride.status.in_(ACTIVE_RIDE_STATUSES))
+)
+# UNION ALL of two index probes; SQLite won't use the (rider_id|driver_id, status)
+# indexes through an OR across the two columns.
+_ACTIVE_RIDE_FOR_USER = (
+    select(Ride).options(selectinload(Ride.rider), selectinload(Ride.driver))
+    .where(Ride.id.in_(union_all(
+        select(Ride.id).where(and_(Ride.rider_id == bindparam("user_id"), Ride.status.in_(ACTIVE_RIDE_STATUSES))),
+        select(Ride.id).where(and_(Ride.driver_id == bindparam("user_id"), Ride.status.in_(ACTIVE_RIDE_STATUSES))),
+    )))
+)
+
+
 # ==================== Driver Operations ====================
 
 async def create_driver(user_id: int, name: str, vehicle_type: VehicleType, 
@@ -109,7 +381,7 @@ async def create_driver(user_id: int, name: str, vehicle_type: VehicleType,
                        license_file_id: str = None) -> Driver:
     """Create a new driver or update existing one."""
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == user_id))
+        result = await session.execute(_DRIVER_BY_ID, {"id": user_id})
         driver = result.scalar_one_or_none()
         
         if driver:
@@ -140,93 +412,163 @@ async def create_driver(user_id: int, name: str, vehicle_type: VehicleType,
             session.add(driver)
         
         await session.commit()
-        await session.refresh(driver)
+        driver_cache.pop(user_id)
+        if driver.available:
+            available_driver_index.add(DriverPosition(
+                driver.id, driver.name, driver.vehicle_type, driver.latitude, driver.longitude
+            ))
         return driver
 
 
 async def get_driver(user_id: int) -> Optional[Driver]:
+    driver = driver_cache.get(user_id)
+    if driver is not None:
+        return driver
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == user_id))
-        return result.scalar_one_or_none()
+        result = await session.execute(_DRIVER_BY_ID, {"id": user_id})
+        driver = result.scalar_one_or_none()
+    if driver is not None:
+        driver_cache.set(user_id, driver)
+    return driver
 
 
 async def set_driver_availability(user_id: int, available: bool) -> bool:
+    """
+    Toggle a driver's availability. Going available is refused (returns False)
+    unless the driver is APPROVED and has no active ride; both checks ride along
+    in the UPDATE (the ride check as a NOT EXISTS probe of ix_ride_driver_status),
+    so a status changed by another process can't be bypassed through a stale cache.
+    """
+    criteria = [Driver.id == user_id]
+    if available:
+        criteria.append(Driver.status == DriverStatus.APPROVED)
+        criteria.append(~exists().where(
+            Ride.driver_id == user_id, Ride.status.in_(ACTIVE_RIDE_STATUSES)
+        ))
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == user_id))
-        driver = result.scalar_one_or_none()
-        if driver:
-            driver.available = available
-            await session.commit()
-            return True
-        return False
+        result = await session.execute(
+            update(Driver).where(*criteria).values(available=available)
+            .returning(*_DRIVER_POSITION_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        await session.commit()
+        driver_cache.pop(user_id)
+        if row is None:
+            return False
+        if available:
+            available_driver_index.add(DriverPosition(*row))
+        else:
+            available_driver_index.discard(user_id)
+        return True
 
 
 async def get_pending_drivers() -> List[Driver]:
     """Get all drivers with PENDING status."""
     async with get_session() as session:
         result = await session.execute(select(Driver).where(Driver.status == DriverStatus.PENDING))
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 async def update_driver_status(user_id: int, status: DriverStatus) -> bool:
     """Update a driver's verification status."""
+    values = {"status": status}
+    if status != DriverStatus.APPROVED:
+        values["available"] = False
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == user_id))
-        driver = result.scalar_one_or_none()
-        if driver:
-            driver.status = status
-            if status != DriverStatus.APPROVED:
-                driver.available = False
-            await session.commit()
-            return True
-        return False
+        result = await session.execute(
+            update(Driver).where(Driver.id == user_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        driver_cache.pop(user_id)
+        if "available" in values:
+            available_driver_index.discard(user_id)
+        return result.rowcount > 0
 
 
 async def update_driver_location(driver_id: int, lat: float, lng: float) -> bool:
     """Update a driver's current GPS coordinates."""
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == driver_id))
-        driver = result.scalar_one_or_none()
-        if driver:
-            driver.latitude = lat
-            driver.longitude = lng
-            await session.commit()
-            return True
-        return False
+        result = await session.execute(
+            update(Driver).where(Driver.id == driver_id).values(latitude=lat, longitude=lng)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        driver_cache.pop(driver_id)
+        available_driver_index.move(driver_id, lat, lng)
+        return result.rowcount > 0
+
+
+def _driver_rating_update(driver_id: int, new_rating: int):
+    # Accumulate the exact integer sum and derive the average from it in the same
+    # UPDATE, so concurrent ratings can't lose an update and the average never drifts
+    new_avg = cast(Driver.rating_sum + new_rating, Numeric) / (Driver.total_rides + 1)
+    return (
+        update(Driver).where(Driver.id == driver_id)
+        .values(
+            rating_sum=Driver.rating_sum + new_rating,
+            total_rides=Driver.total_rides + 1,
+            rating=func.round(new_avg, 2),
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def update_driver_rating(driver_id: int, new_rating: int):
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == driver_id))
-        driver = result.scalar_one_or_none()
-        if driver:
-            total_rides = driver.total_rides
-            current_rating = driver.rating
-            new_avg = ((current_rating * total_rides) + new_rating) / (total_rides + 1)
-            driver.rating = round(new_avg, 2)
-            driver.total_rides += 1
-            await session.commit()
+        await session.execute(_driver_rating_update(driver_id, new_rating))
+        await session.commit()
+        driver_cache.pop(driver_id)
 
 
 async def get_all_drivers() -> List[Driver]:
     """Get all registered drivers."""
     async with get_session() as session:
         result = await session.execute(select(Driver))
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
-async def get_available_drivers() -> List[Driver]:
-    """Get all drivers currently marked as available."""
+async def get_drivers_page(page: int, page_size: int = 20) -> Tuple[List[Driver], bool]:
+    """
+    Get one page of drivers, best rated first.
+    Returns (drivers, has_next); one extra row is fetched to detect a following page.
+    """
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.available == True))
-        return list(result.scalars().all())
+        result = await session.execute(
+            select(Driver).order_by(Driver.rating.desc(), Driver.id)
+            .limit(page_size + 1).offset(page * page_size)
+        )
+        drivers = result.scalars().all()
+        return drivers[:page_size], len(drivers) > page_size
+
+
+async def get_candidate_drivers(lat: float, lng: float, radius_km: float, limit: int = 20) -> List[DriverPosition]:
+    """
+    Get available drivers inside a bounding box around (lat, lng), nearest first.
+
+    Served from available_driver_index; when the index is older than
+    AVAILABLE_DRIVERS_TTL it is reloaded with one query over the available
+    drivers. Corners of the box lie outside radius_km, so callers still apply
+    the exact distance cutoff.
+    """
+    if not available_driver_index.is_fresh():
+        generation = available_driver_index.generation
+        async with get_session() as session:
+            result = await session.execute(_AVAILABLE_DRIVERS)
+            snapshot = [DriverPosition(*row) for row in result]
+        available_driver_index.load(snapshot, generation)
+        if not available_driver_index.is_fresh():
+            # A local write raced the reload; answer from the snapshot and retry next time
+            return nearest_in_box(snapshot, lat, lng, radius_km, limit)
+    return available_driver_index.candidates(lat, lng, radius_km, limit)
 
 
 # ==================== Rider Operations ====================
 
 async def create_rider(user_id: int, name: str, phone_number: str = None) -> Rider:
     async with get_session() as session:
-        result = await session.execute(select(Rider).where(Rider.id == user_id))
+        result = await session.execute(_RIDER_BY_ID, {"id": user_id})
         rider = result.scalar_one_or_none()
         if rider:
             rider.name = name
@@ -236,21 +578,27 @@ async def create_rider(user_id: int, name: str, phone_number: str = None) -> Rid
             rider = Rider(id=user_id, name=name, phone_number=phone_number, language_code="en")
             session.add(rider)
         await session.commit()
-        await session.refresh(rider)
+        rider_cache.pop(user_id)
         return rider
 
 
 async def get_rider(user_id: int) -> Optional[Rider]:
+    rider = rider_cache.get(user_id)
+    if rider is not None:
+        return rider
     async with get_session() as session:
-        result = await session.execute(select(Rider).where(Rider.id == user_id))
-        return result.scalar_one_or_none()
+        result = await session.execute(_RIDER_BY_ID, {"id": user_id})
+        rider = result.scalar_one_or_none()
+    if rider is not None:
+        rider_cache.set(user_id, rider)
+    return rider
 
 
 async def get_saved_locations(rider_id: int) -> List[SavedLocation]:
     """Get all saved locations for a rider."""
     async with get_session() as session:
         result = await session.execute(select(SavedLocation).where(SavedLocation.rider_id == rider_id))
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 async def add_saved_location(rider_id: int, name: str, latitude: float, longitude: float) -> SavedLocation:
@@ -264,36 +612,56 @@ async def add_saved_location(rider_id: int, name: str, latitude: float, longitud
         )
         session.add(loc)
         await session.commit()
-        await session.refresh(loc)
         return loc
 
 
 async def set_user_language(user_id: int, language_code: str) -> bool:
+    # A user may be registered as a driver, a rider, or both; update whichever rows exist
     async with get_session() as session:
-        result = await session.execute(select(Driver).where(Driver.id == user_id))
-        user = result.scalar_one_or_none()
-        if not user:
-            result = await session.execute(select(Rider).where(Rider.id == user_id))
-            user = result.scalar_one_or_none()
-        if not user: return False
-        user.language_code = language_code
+        drivers = await session.execute(
+            update(Driver).where(Driver.id == user_id).values(language_code=language_code)
+            .execution_options(synchronize_session=False)
+        )
+        riders = await session.execute(
+            update(Rider).where(Rider.id == user_id).values(language_code=language_code)
+            .execution_options(synchronize_session=False)
+        )
         await session.commit()
-        return True
+    driver_cache.pop(user_id)
+    rider_cache.pop(user_id)
+    language_cache.pop(user_id)
+    return (drivers.rowcount + riders.rowcount) > 0
+
+
+async def get_user_language(user_id: int) -> Optional[str]:
+    """Language of a registered rider or driver, or None for an unknown user."""
+    lang = language_cache.get(user_id)
+    if lang is not None:
+        return lang
+    user = rider_cache.get(user_id) or driver_cache.get(user_id)
+    if user is not None:
+        return user.language_code
+    async with get_session() as session:
+        result = await session.execute(_USER_LANGUAGE, {"id": user_id})
+        lang = result.scalar_one_or_none()
+    if lang is not None:
+        language_cache.set(user_id, lang)
+    return lang
 
 
 # ==================== Wallet Operations ====================
 
 async def update_wallet_balance(user_id: int, amount: float, is_driver: bool = False) -> bool:
     """Add amount to user's wallet. Use negative amount to deduct."""
+    model = Driver if is_driver else Rider
     async with get_session() as session:
-        model = Driver if is_driver else Rider
-        result = await session.execute(select(model).where(model.id == user_id))
-        user = result.scalar_one_or_none()
-        if user:
-            user.wallet_balance += amount
-            await session.commit()
-            return True
-        return False
+        result = await session.execute(
+            update(model).where(model.id == user_id).values(wallet_balance=model.wallet_balance + amount)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        (driver_cache if is_driver else rider_cache).pop(user_id)
+        return result.rowcount > 0
 
 
 # ==================== Ride Operations ====================
@@ -302,102 +670,228 @@ async def create_ride(rider_id: int, rider_lat: float, rider_lng: float,
                       dest_lat: float = None, dest_lng: float = None,
                       estimated_fare: float = None, estimated_duration: int = None) -> Ride:
     async with get_session() as session:
-        ride = Ride(
-            rider_id=rider_id, 
-            status=RideStatus.REQUESTED, 
-            rider_lat=rider_lat, 
-            rider_lng=rider_lng,
-            dest_lat=dest_lat,
-            dest_lng=dest_lng,
-            estimated_fare=estimated_fare,
-            estimated_duration=estimated_duration
+        # INSERT ... RETURNING hands back the populated row, so no refresh() is needed
+        ride = await session.scalar(
+            insert(Ride).values(
+                rider_id=rider_id,
+                status=RideStatus.REQUESTED,
+                rider_lat=rider_lat,
+                rider_lng=rider_lng,
+                dest_lat=dest_lat,
+                dest_lng=dest_lng,
+                estimated_fare=estimated_fare,
+                estimated_duration=estimated_duration
+            ).returning(Ride)
         )
-        session.add(ride)
-        history = RideHistory(ride=ride, status=RideStatus.REQUESTED)
-        session.add(history)
+        await session.execute(insert(RideHistory).values(ride_id=ride.id, status=RideStatus.REQUESTED))
         await session.commit()
-        await session.refresh(ride)
         return ride
 
 
 async def assign_driver_to_ride(ride_id: int, driver_id: int, distance: float) -> bool:
+    """
+    Atomically assign a driver to a requested ride.
+    Each UPDATE carries its own guard (driver still available and APPROVED, ride still REQUESTED),
+    so no SELECT ... FOR UPDATE is needed and a lost race simply matches zero rows.
+    """
     async with get_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                select(Driver).where(and_(Driver.id == driver_id, Driver.available == True)).with_for_update()
-            )
-            driver = result.scalar_one_or_none()
-            if not driver: return False
-            result = await session.execute(select(Ride).where(Ride.id == ride_id))
-            ride = result.scalar_one_or_none()
-            if not ride or ride.status != RideStatus.REQUESTED: return False
-            ride.driver_id = driver_id
-            ride.distance = distance
-            ride.status = RideStatus.ASSIGNED
-            driver.available = False
-            history = RideHistory(ride_id=ride_id, status=RideStatus.ASSIGNED)
-            session.add(history)
+        claimed = await session.execute(
+            update(Driver).where(and_(
+                Driver.id == driver_id, Driver.available == True, Driver.status == DriverStatus.APPROVED
+            ))
+            .values(available=False)
+            .execution_options(synchronize_session=False)
+        )
+        if not claimed.rowcount: return False
+        assigned = await session.execute(
+            update(Ride).where(and_(Ride.id == ride_id, Ride.status == RideStatus.REQUESTED))
+            .values(driver_id=driver_id, distance=distance, status=RideStatus.ASSIGNED)
+            .execution_options(synchronize_session=False)
+        )
+        if not assigned.rowcount:
+            await session.rollback()
+            return False
+        await session.execute(insert(RideHistory).values(ride_id=ride_id, status=RideStatus.ASSIGNED))
+        await session.commit()
+        ride_cache.pop(ride_id)
+        driver_cache.pop(driver_id)
+        available_driver_index.discard(driver_id)
         return True
 
 
-async def get_ride(ride_id: int) -> Optional[Ride]:
+async def get_ride(ride_id: int, cached: bool = True) -> Optional[Ride]:
+    """
+    Ride with its rider and driver loaded. ride_cache is only invalidated by this
+    process's writers, so callers in another process (the admin API) pass
+    cached=False to see the bot's transitions without waiting out RIDE_CACHE_TTL.
+    """
+    if cached:
+        ride = ride_cache.get(ride_id)
+        if ride is not None:
+            return ride
     async with get_session() as session:
-        result = await session.execute(
-            select(Ride).options(selectinload(Ride.rider), selectinload(Ride.driver)).where(Ride.id == ride_id)
-        )
-        return result.scalar_one_or_none()
+        result = await session.execute(_RIDE_WITH_PARTIES_BY_ID, {"id": ride_id})
+        ride = result.scalar_one_or_none()
+    if cached and ride is not None:
+        ride_cache.set(ride_id, ride)
+    return ride
 
 
 async def get_active_ride_for_user(user_id: int) -> Optional[Ride]:
+    """Active ride in either role; prefer the role-specific lookups when the role is known."""
     async with get_session() as session:
-        result = await session.execute(
-            select(Ride).options(selectinload(Ride.rider), selectinload(Ride.driver))
-            .where(and_(or_(Ride.rider_id == user_id, Ride.driver_id == user_id),
-                        Ride.status.in_([RideStatus.REQUESTED, RideStatus.ASSIGNED, RideStatus.ONGOING])))
-        )
+        result = await session.execute(_ACTIVE_RIDE_FOR_USER, {"user_id": user_id})
         return result.scalar_one_or_none()
 
 
-async def update_ride_status(ride_id: int, new_status: RideStatus) -> bool:
+async def get_active_ride_for_rider(user_id: int) -> Optional[Ride]:
+    """Active ride the user booked as a rider (single probe of ix_ride_rider_status)."""
     async with get_session() as session:
-        result = await session.execute(select(Ride).where(Ride.id == ride_id))
-        ride = result.scalar_one_or_none()
-        if not ride: return False
-        ride.status = new_status
-        if new_status in [RideStatus.COMPLETED, RideStatus.CANCELLED]:
-            ride.completed_at = datetime.utcnow()
-            if ride.driver_id:
-                res = await session.execute(select(Driver).where(Driver.id == ride.driver_id))
-                driver = res.scalar_one_or_none()
-                if driver: driver.available = True
-        history = RideHistory(ride_id=ride_id, status=new_status)
-        session.add(history)
+        result = await session.execute(_ACTIVE_RIDE_FOR_RIDER, {"user_id": user_id})
+        return result.scalars().first()
+
+
+async def _release_driver(session: AsyncSession, driver_id: int) -> Optional[Row]:
+    """
+    Mark a driver available again inside the caller's transaction; returns their
+    position row, or None if they are no longer APPROVED (e.g. rejected mid-ride).
+    """
+    result = await session.execute(
+        update(Driver).where(Driver.id == driver_id, Driver.status == DriverStatus.APPROVED)
+        .values(available=True)
+        .returning(*_DRIVER_POSITION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first()
+
+
+def _driver_released(row: Row) -> None:
+    """Post-commit bookkeeping for a driver freed by _release_driver."""
+    driver_cache.pop(row.id)
+    available_driver_index.add(DriverPosition(*row))
+
+
+async def _change_ride_status(session: AsyncSession, criteria, values: dict,
+                              new_status: RideStatus) -> Optional[Row]:
+    """
+    Apply a guarded status UPDATE to one ride and log it to ride_history.
+
+    On PostgreSQL both writes travel as one statement through data-modifying
+    CTEs; SQLite has no DML in CTEs, so it gets UPDATE ... RETURNING followed
+    by the INSERT. Returns a row with the ride's driver_id, or None if the
+    criteria matched nothing.
+    """
+    changed = update(Ride).where(*criteria).values(**values)
+    if engine.dialect.name == "postgresql":
+        changed = changed.returning(Ride.id, Ride.driver_id).cte("changed")
+        logged = insert(RideHistory).from_select(
+            ["ride_id", "status"], select(changed.c.id, literal(new_status, RideHistory.status.type))
+        ).cte("logged")
+        result = await session.execute(select(changed.c.driver_id).add_cte(logged))
+        return result.first()
+    result = await session.execute(
+        changed.returning(Ride.id, Ride.driver_id).execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row is not None:
+        await session.execute(insert(RideHistory).values(ride_id=row.id, status=new_status))
+    return row
+
+
+async def update_ride_status(ride_id: int, new_status: RideStatus,
+                             expected_status: Optional[RideStatus] = None) -> bool:
+    """
+    Move a ride to `new_status`. With `expected_status`, the transition only
+    applies if the ride is still in that status — a compare-and-set, so of two
+    concurrent taps on the same button exactly one gets True.
+    """
+    ride_finished = new_status in (RideStatus.COMPLETED, RideStatus.CANCELLED)
+    values = {"status": new_status}
+    if ride_finished:
+        values["completed_at"] = func.now()  # stamped by the database, not the worker clock
+    criteria = (Ride.id == ride_id,)
+    if expected_status is not None:
+        criteria += (Ride.status == expected_status,)
+    async with get_session() as session:
+        row = await _change_ride_status(session, criteria, values, new_status)
+        if row is None: return False
+        driver_id = row.driver_id
+        released = None
+        if ride_finished and driver_id:
+            released = await _release_driver(session, driver_id)
         await session.commit()
+        ride_cache.pop(ride_id)
+        if released is not None:
+            _driver_released(released)
         return True
 
 
-async def add_ride_rating(ride_id: int, rating: int) -> bool:
+async def add_ride_rating(ride_id: int, rating: int, rider_id: Optional[int] = None) -> bool:
+    """
+    Rate a completed ride once and fold the rating into its driver's average, in one
+    transaction. A guarded UPDATE replaces the load-then-save, so a repeated tap
+    can't count the same ride twice. Pass rider_id to also require that rider's ride.
+    """
+    criteria = [Ride.id == ride_id, Ride.status == RideStatus.COMPLETED, Ride.rating.is_(None)]
+    if rider_id is not None:
+        criteria.append(Ride.rider_id == rider_id)
     async with get_session() as session:
-        result = await session.execute(select(Ride).where(Ride.id == ride_id))
-        ride = result.scalar_one_or_none() # FIXED the NameError here
-        if not ride or ride.status != RideStatus.COMPLETED: return False
-        ride.rating = rating
+        result = await session.execute(
+            update(Ride).where(*criteria).values(rating=rating)
+            .returning(Ride.driver_id)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        if row is None:
+            return False  # unknown ride, not completed, already rated, or not this rider's
+        if row.driver_id:
+            await session.execute(_driver_rating_update(row.driver_id, rating))
         await session.commit()
-        if ride.driver_id:
-            await update_driver_rating(ride.driver_id, rating)
-        return True
+    ride_cache.pop(ride_id)
+    if row.driver_id:
+        driver_cache.pop(row.driver_id)
+    return True
+
+
+async def _cancel_active_ride(ride_id: int, *criteria) -> Optional[Row]:
+    async with get_session() as session:
+        row = await _change_ride_status(
+            session,
+            (Ride.id == ride_id, Ride.status.in_(ACTIVE_RIDE_STATUSES), *criteria),
+            {"status": RideStatus.CANCELLED, "completed_at": func.now()},
+            RideStatus.CANCELLED,
+        )
+        if row is None:
+            return None  # unknown ride, already completed/cancelled, or criteria not met
+        released = await _release_driver(session, row.driver_id) if row.driver_id else None
+        await session.commit()
+        ride_cache.pop(ride_id)
+        if released is not None:
+            _driver_released(released)
+        return row
 
 
 async def cancel_ride(ride_id: int) -> bool:
-    return await update_ride_status(ride_id, RideStatus.CANCELLED)
+    """Cancel a ride that is still active and release its driver, in one transaction."""
+    return await _cancel_active_ride(ride_id) is not None
+
+
+async def cancel_own_ride(ride_id: int, rider_id: int) -> Optional[Row]:
+    """
+    Cancel `rider_id`'s own active ride. The ownership and status checks are part
+    of the UPDATE itself, so there is no read-then-write window. Returns a row
+    whose driver_id is the released driver (None if none was assigned yet), or
+    None if the ride is not this rider's active ride.
+    """
+    return await _cancel_active_ride(ride_id, Ride.rider_id == rider_id)
 
 
 async def get_ride_history(ride_id: int) -> List[RideHistory]:
     async with get_session() as session:
         result = await session.execute(
-            select(RideHistory).where(RideHistory.ride_id == ride_id).order_by(RideHistory.timestamp)
+            select(RideHistory).where(RideHistory.ride_id == ride_id).order_by(RideHistory.timestamp, RideHistory.id)
         )
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 # ==================== Phase 1: New Query Functions ====================
@@ -405,38 +899,29 @@ async def get_ride_history(ride_id: int) -> List[RideHistory]:
 async def get_rider_ride_count(user_id: int) -> int:
     """Get total number of rides for a rider."""
     async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Ride.id)).where(Ride.rider_id == user_id)
-        )
+        result = await session.execute(_RIDER_RIDE_COUNT, {"user_id": user_id})
         return result.scalar() or 0
 
 
 async def get_driver_completed_rides_count(driver_id: int) -> int:
     """Get total completed rides for a driver."""
     async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Ride.id)).where(
-                and_(Ride.driver_id == driver_id, Ride.status == RideStatus.COMPLETED)
-            )
-        )
+        result = await session.execute(_DRIVER_COMPLETED_COUNT, {"driver_id": driver_id})
         return result.scalar() or 0
 
 
-async def get_driver_today_rides(driver_id: int) -> int:
-    """Get today's ride count for a driver."""
+async def get_driver_ride_counts(driver_id: int) -> Tuple[int, int]:
+    """(today's, all-time) completed ride counts for a driver, from one scan."""
     from datetime import date
     today_start = datetime.combine(date.today(), datetime.min.time())
     async with get_session() as session:
-        result = await session.execute(
-            select(func.count(Ride.id)).where(
-                and_(
-                    Ride.driver_id == driver_id,
-                    Ride.status == RideStatus.COMPLETED,
-                    Ride.completed_at >= today_start
-                )
-            )
-        )
-        return result.scalar() or 0
+        today, total = (await session.execute(
+            select(
+                func.coalesce(func.sum(case((Ride.completed_at >= today_start, 1), else_=0)), 0),
+                func.count(Ride.id),
+            ).where(Ride.driver_id == driver_id, Ride.status == RideStatus.COMPLETED)
+        )).one()
+        return today, total
 
 
 async def get_completed_rides(limit: int = 20) -> List[Ride]:
@@ -449,7 +934,7 @@ async def get_completed_rides(limit: int = 20) -> List[Ride]:
             .order_by(Ride.completed_at.desc())
             .limit(limit)
         )
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 async def get_cancelled_rides(limit: int = 20) -> List[Ride]:
@@ -462,46 +947,38 @@ async def get_cancelled_rides(limit: int = 20) -> List[Ride]:
             .order_by(Ride.completed_at.desc())
             .limit(limit)
         )
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 async def get_all_riders() -> List[Rider]:
     """Get all registered riders."""
     async with get_session() as session:
         result = await session.execute(select(Rider))
-        return list(result.scalars().all())
+        return result.scalars().all()
 
 
 async def get_platform_stats() -> dict:
     """Get comprehensive platform statistics."""
     async with get_session() as session:
-        # Drivers
-        total_drivers = (await session.execute(select(func.count(Driver.id)))).scalar() or 0
-        available_drivers = (await session.execute(
-            select(func.count(Driver.id)).where(Driver.available == True)
-        )).scalar() or 0
+        # One scan per table, with conditional aggregation for the per-status counts
+        total_drivers, available_drivers = (await session.execute(
+            select(
+                func.count(Driver.id),
+                func.coalesce(func.sum(case((Driver.available == True, 1), else_=0)), 0),
+            )
+        )).one()
         
-        # Riders
         total_riders = (await session.execute(select(func.count(Rider.id)))).scalar() or 0
         
-        # Rides
-        total_rides = (await session.execute(select(func.count(Ride.id)))).scalar() or 0
-        completed_rides = (await session.execute(
-            select(func.count(Ride.id)).where(Ride.status == RideStatus.COMPLETED)
-        )).scalar() or 0
-        cancelled_rides = (await session.execute(
-            select(func.count(Ride.id)).where(Ride.status == RideStatus.CANCELLED)
-        )).scalar() or 0
-        active_rides = (await session.execute(
-            select(func.count(Ride.id)).where(
-                Ride.status.in_([RideStatus.REQUESTED, RideStatus.ASSIGNED, RideStatus.ONGOING])
+        total_rides, completed_rides, cancelled_rides, active_rides, avg_rating = (await session.execute(
+            select(
+                func.count(Ride.id),
+                func.coalesce(func.sum(case((Ride.status == RideStatus.COMPLETED, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Ride.status == RideStatus.CANCELLED, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Ride.status.in_(ACTIVE_RIDE_STATUSES), 1), else_=0)), 0),
+                func.avg(Ride.rating),  # AVG skips NULL ratings
             )
-        )).scalar() or 0
-        
-        # Averages
-        avg_rating = (await session.execute(
-            select(func.avg(Ride.rating)).where(Ride.rating.isnot(None))
-        )).scalar()
+        )).one()
         
         completion_rate = (completed_rides / total_rides * 100) if total_rides > 0 else 0
         
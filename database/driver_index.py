@@ -0,0 +1,138 @@
+"""
+In-memory index of available drivers for the Rideshare Bot.
+Lets matching run against RAM instead of querying the drivers table per request.
+"""
+import heapq
+import math
+import time
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from enums import VehicleType
+
+KM_PER_DEGREE_LAT = 111.0
+# Side of a grid bucket in degrees (~5.5 km of latitude); a 10 km search reads ~25 buckets
+CELL_DEGREES = 0.05
+
+Cell = Tuple[int, int]
+
+
+def _cell(lat: float, lng: float) -> Cell:
+    return math.floor(lat / CELL_DEGREES), math.floor(lng / CELL_DEGREES)
+
+
+class DriverPosition(NamedTuple):
+    """The fields matching needs about an available driver."""
+    id: int
+    name: str
+    vehicle_type: VehicleType
+    latitude: float
+    longitude: float
+
+
+class AvailableDriverIndex:
+    """
+    Process-local map of available drivers, kept current by the DB writers.
+
+    Writes made by other processes (e.g. the admin API) are not seen directly,
+    so the index is considered stale after `ttl` seconds and reloaded from the
+    database by the caller. Every local mutation bumps `generation`, which lets
+    a reload detect that it raced with a write and must not be trusted.
+
+    Drivers are also bucketed on a CELL_DEGREES grid, so a query only looks at
+    the buckets its bounding box overlaps rather than every available driver.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._drivers: Dict[int, DriverPosition] = {}
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._loaded_at = None
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, drivers: Iterable[DriverPosition], generation: int) -> None:
+        """Replace the contents with a DB snapshot taken when `generation` was current."""
+        if generation != self.generation:
+            return  # a local write landed while the snapshot was in flight
+        self._drivers = {}
+        self._cells = {}
+        for driver in drivers:
+            self._put(driver)
+        self._loaded_at = time.monotonic()
+
+    def _put(self, driver: DriverPosition) -> None:
+        self._remove(driver.id)
+        self._drivers[driver.id] = driver
+        self._cells.setdefault(_cell(driver.latitude, driver.longitude), set()).add(driver.id)
+
+    def _remove(self, driver_id: int) -> None:
+        driver = self._drivers.pop(driver_id, None)
+        if driver is None:
+            return
+        cell = _cell(driver.latitude, driver.longitude)
+        bucket = self._cells[cell]
+        bucket.discard(driver_id)
+        if not bucket:
+            del self._cells[cell]
+
+    def add(self, driver: DriverPosition) -> None:
+        self._put(driver)
+        self.generation += 1
+
+    def discard(self, driver_id: int) -> None:
+        self._remove(driver_id)
+        self.generation += 1
+
+    def move(self, driver_id: int, latitude: float, longitude: float) -> None:
+        driver = self._drivers.get(driver_id)
+        if driver is not None:
+            self._put(driver._replace(latitude=latitude, longitude=longitude))
+        self.generation += 1
+
+    def candidates(self, lat: float, lng: float, radius_km: float, limit: int = 20) -> List[DriverPosition]:
+        """Drivers inside the bounding box around (lat, lng), nearest first by planar distance."""
+        dlat, dlng = box_half_sides(lat, radius_km)
+        lat_lo, lng_lo = _cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = _cell(lat + dlat, lng + dlng)
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) >= len(self._cells):
+            nearby = self._drivers.values()  # the box spans most buckets; scan directly
+        else:
+            drivers, cells = self._drivers, self._cells
+            nearby = [
+                drivers[driver_id]
+                for cell_lat in range(lat_lo, lat_hi + 1)
+                for cell_lng in range(lng_lo, lng_hi + 1)
+                for driver_id in cells.get((cell_lat, cell_lng), ())
+            ]
+        return nearest_in_box(nearby, lat, lng, radius_km, limit)
+
+    def __len__(self) -> int:
+        return len(self._drivers)
+
+
+def box_half_sides(lat: float, radius_km: float) -> Tuple[float, float]:
+    """Half the (latitude, longitude) extent in degrees of the box around a point."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return dlat, dlng
+
+
+def nearest_in_box(drivers: Iterable[DriverPosition], lat: float, lng: float,
+                   radius_km: float, limit: int) -> List[DriverPosition]:
+    """
+    The nearest `limit` drivers inside the bounding box around (lat, lng), by planar
+    distance with longitude scaled by cos(lat). Box corners lie outside radius_km.
+    """
+    dlat, dlng = box_half_sides(lat, radius_km)
+    lng_scale = max(math.cos(math.radians(lat)), 1e-6)
+    scale_sq = lng_scale * lng_scale
+    in_box = [
+        d for d in drivers
+        if abs(d.latitude - lat) <= dlat and abs(d.longitude - lng) <= dlng
+    ]
+    # Same order as sorting then slicing, without sorting drivers past the limit
+    return heapq.nsmallest(
+        limit, in_box, key=lambda d: (d.latitude - lat) ** 2 + (d.longitude - lng) ** 2 * scale_sq
+    )
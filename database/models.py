@@ -4,14 +4,45 @@ Defines the schema for drivers, riders, and rides with proper relationships.
 
 Note: FSM manages interaction flow, while the database is the single source of truth for ride state.
 """
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum, BigInteger
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum, BigInteger, Index
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.sql import func
 from enums import RideStatus, VehicleType, DriverStatus
 
 Base = declarative_base()
 
 
+class RideStatusType(TypeDecorator):
+    """
+    Stores RideStatus as a stable SMALLINT code instead of its name.
+    Keeps rides/ride_history rows and their status indexes compact.
+    """
+    impl = SmallInteger
+    cache_ok = True
+    
+    # Never renumber: these codes are persisted
+    CODES = {
+        RideStatus.REQUESTED: 1,
+        RideStatus.ASSIGNED: 2,
+        RideStatus.ONGOING: 3,
+        RideStatus.AWAITING_PAYMENT: 4,
+        RideStatus.COMPLETED: 5,
+        RideStatus.CANCELLED: 6,
+    }
+    STATUSES = {code: status for status, code in CODES.items()}
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self.CODES[RideStatus(value)]
+    
+    def process_literal_param(self, value, dialect):
+        return self.process_bind_param(value, dialect)
+    
+    def process_result_value(self, value, dialect):
+        # int() because pre-migration SQLite columns have TEXT affinity and hand back '5'
+        return None if value is None else self.STATUSES[int(value)]
+
+
 class Driver(Base):
     """Driver model - stores driver information and availability."""
     __tablename__ = "drivers"
@@ -26,11 +57,17 @@ class Driver(Base):
     available = Column(Boolean, default=False)
     latitude = Column(Float, nullable=False)  # Dummy location
     longitude = Column(Float, nullable=False)  # Dummy location
-    rating = Column(Float, default=5.0)
+    rating = Column(Float, default=5.0)  # Display value, kept equal to rating_sum / total_rides
+    rating_sum = Column(Integer, default=0)  # Exact sum of all ratings received
     total_rides = Column(Integer, default=0)
     wallet_balance = Column(Float, default=0.0)
     language_code = Column(String(5), default="en")  # 'en', 'am', 'om'
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    
+    __table_args__ = (
+        # The in-memory driver index reloads from WHERE available
+        Index("ix_drivers_available", "available"),
+    )
     
     # Relationships
     rides = relationship("Ride", back_populates="driver", foreign_keys="Ride.driver_id")
@@ -48,7 +85,7 @@ class Rider(Base):
     phone_number = Column(String(20), nullable=True)  # Optional phone number
     language_code = Column(String(5), default="en")  # 'en', 'am', 'om'
     wallet_balance = Column(Float, default=0.0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     
     # Relationships
     rides = relationship("Ride", back_populates="rider", foreign_keys="Ride.rider_id")
@@ -66,7 +103,7 @@ class SavedLocation(Base):
     name = Column(String(50), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     
     rider = relationship("Rider", back_populates="saved_locations")
     
@@ -81,11 +118,16 @@ class Ride(Base):
     Status flow: REQUESTED → ASSIGNED → ONGOING → COMPLETED/CANCELLED
     """
     __tablename__ = "rides"
+    __table_args__ = (
+        # Active-ride lookups probe by participant + status on nearly every update
+        Index("ix_ride_rider_status", "rider_id", "status"),
+        Index("ix_ride_driver_status", "driver_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     rider_id = Column(BigInteger, ForeignKey("riders.id"), nullable=False)
     driver_id = Column(BigInteger, ForeignKey("drivers.id"), nullable=True)  # Null until assigned
-    status = Column(SQLEnum(RideStatus), nullable=False, default=RideStatus.REQUESTED)
+    status = Column(RideStatusType(), nullable=False, default=RideStatus.REQUESTED)
     rider_lat = Column(Float, nullable=False)  # Pickup location
     rider_lng = Column(Float, nullable=False)
     dest_lat = Column(Float, nullable=True)    # Destination location
@@ -96,7 +138,7 @@ class Ride(Base):
     final_fare = Column(Float, nullable=True)  # Actual charged amount
     payment_method = Column(String(20), nullable=True) # CASH, WALLET, CARD
     rating = Column(Integer, nullable=True)    # Rider's rating of driver (1-5)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime, nullable=True)
     
     # Relationships
@@ -108,20 +150,48 @@ class Ride(Base):
         return f"<Ride(id={self.id}, rider_id={self.rider_id}, driver_id={self.driver_id}, status={self.status.value})>"
 
 
+# Most rides end up COMPLETED/CANCELLED, so a partial index over the active
+# statuses stays tiny while serving the admin dashboard and stats counts
+_ACTIVE_STATUS_PREDICATE = Ride.status.in_([RideStatus.REQUESTED, RideStatus.ASSIGNED, RideStatus.ONGOING])
+Index(
+    "ix_rides_status_active", Ride.status,
+    postgresql_where=_ACTIVE_STATUS_PREDICATE,
+    sqlite_where=_ACTIVE_STATUS_PREDICATE,
+)
+
+
 class RideHistory(Base):
     """
     Ride history model - tracks status changes for analytics and debugging.
     Provides audit trail for ride lifecycle.
     """
     __tablename__ = "ride_history"
+    __table_args__ = (
+        # get_ride_history reads one ride's trail in timestamp order
+        Index("ix_ridehistory_ride_ts", "ride_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     ride_id = Column(Integer, ForeignKey("rides.id"), nullable=False)
-    status = Column(SQLEnum(RideStatus), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    status = Column(RideStatusType(), nullable=False)
+    timestamp = Column(DateTime, default=func.now(), server_default=func.now())
     
     # Relationships
     ride = relationship("Ride", back_populates="history")
     
     def __repr__(self):
         return f"<RideHistory(ride_id={self.ride_id}, status={self.status.value}, timestamp={self.timestamp})>"
+
+
+class SchemaMeta(Base):
+    """
+    Key/value store for schema bookkeeping.
+    init_db records the applied schema version here so steady-state startups can skip inspection.
+    """
+    __tablename__ = "schema_meta"
+    
+    key = Column(String(50), primary_key=True)
+    value = Column(String(100), nullable=False)
+    
+    def __repr__(self):
+        return f"<SchemaMeta(key={self.key}, value={self.value})>"
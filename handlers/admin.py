@@ -2,25 +2,30 @@
 Admin handler for the Rideshare Bot.
 Provides admin panel for managing drivers and viewing system statistics.
 """
+import asyncio
+import re
+from functools import partial
+
 from telegram import Update
 from telegram.ext import ContextTypes, MessageHandler, CallbackQueryHandler, filters
 
 from config import ADMIN_IDS
 from database.db import (
-    get_all_drivers, get_active_ride_for_user, get_session,
-    get_platform_stats, get_completed_rides, get_cancelled_rides, get_rider,
+    get_drivers_page, get_session,
+    get_platform_stats, get_completed_rides, get_cancelled_rides,
     get_pending_drivers, update_driver_status, get_driver
 )
-from database.models import Ride, Driver
+from database.models import Ride
 from enums import RideStatus, DriverStatus
 from keyboards.reply import get_admin_menu_keyboard
-from keyboards.inline import get_driver_moderation_keyboard
+from keyboards.inline import get_driver_moderation_keyboard, get_drivers_page_keyboard
 from utils.logger import logger, log_with_context
 from utils.i18n import t
-from sqlalchemy import select, func
+from services.outbox import outbox
+from sqlalchemy import select
 
 
-async def is_admin(user_id: int) -> bool:
+def is_admin(user_id: int) -> bool:
     """Check if user is an admin."""
     return user_id in ADMIN_IDS
 
@@ -29,7 +34,7 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show admin panel (restricted to admins only)."""
     user = update.effective_user
     
-    if not await is_admin(user.id):
+    if not is_admin(user.id):
         await update.message.reply_text("❌ You don't have permission to access the admin panel.")
         return
     
@@ -52,68 +57,91 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     log_with_context(logger, "INFO", "Admin panel accessed", user_id=user.id)
 
 
+DRIVERS_PAGE_SIZE = 20
+
+
+async def _render_drivers_page(page: int):
+    """Build the text and pagination keyboard for one page of the driver list."""
+    drivers, has_next = await get_drivers_page(page, DRIVERS_PAGE_SIZE)
+    if not drivers:
+        return None, None
+    
+    parts = [f"👥 <b>All Drivers</b> (page {page + 1})\n"]
+    for driver in drivers:
+        status = "✅ Available" if driver.available else "❌ Offline"
+        parts.append(
+            f"👤 {driver.name}\n"
+            f"🚗 {driver.vehicle_type.value}\n"
+            f"⭐ {driver.rating:.1f} ({driver.total_rides} rides)\n"
+            f"📍 {status}\n"
+            f"🆔 ID: {driver.id}\n"
+        )
+    return "\n".join(parts), get_drivers_page_keyboard(page, has_next)
+
+
 async def view_all_drivers(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """View all registered drivers."""
+    """View registered drivers, one page at a time."""
     user = update.effective_user
     
-    if not await is_admin(user.id):
+    if not is_admin(user.id):
         await update.message.reply_text("❌ Unauthorized.")
         return
     
-    drivers = await get_all_drivers()
+    message, keyboard = await _render_drivers_page(0)
     
-    if not drivers:
+    if message is None:
         await update.message.reply_text("📋 No drivers registered yet.")
         return
     
-    message = "👥 <b>All Drivers</b>\n\n"
+    await update.message.reply_text(message, reply_markup=keyboard, parse_mode="HTML")
+
+
+async def drivers_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle the Prev/Next buttons under the driver list."""
+    query = update.callback_query
+    if not is_admin(query.from_user.id):
+        await asyncio.gather(query.answer(), query.edit_message_text("❌ Unauthorized."))
+        return
     
-    for driver in drivers:
-        status = "✅ Available" if driver.available else "❌ Offline"
-        message += (
-            f"👤 {driver.name}\n"
-            f"🚗 {driver.vehicle_type.value}\n"
-            f"⭐ {driver.rating:.1f} ({driver.total_rides} rides)\n"
-            f"📍 {status}\n"
-            f"🆔 ID: {driver.id}\n\n"
-        )
+    page = int(context.matches[0].group(1))
+    _, (message, keyboard) = await asyncio.gather(query.answer(), _render_drivers_page(page))
     
-    await update.message.reply_text(message, parse_mode="HTML")
+    if message is None:
+        await query.edit_message_text("📋 No drivers on this page.")
+        return
+    
+    await query.edit_message_text(message, reply_markup=keyboard, parse_mode="HTML")
 
 
 async def view_active_rides(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View all active rides."""
     user = update.effective_user
     
-    if not await is_admin(user.id):
+    if not is_admin(user.id):
         await update.message.reply_text("❌ Unauthorized.")
         return
     
     async with get_session() as session:
+        # Plain column rows: the listing only prints ids, and rows can't lazy-load
         result = await session.execute(
-            select(Ride).where(
+            select(Ride.id, Ride.status, Ride.rider_id, Ride.driver_id).where(
                 Ride.status.in_([RideStatus.REQUESTED, RideStatus.ASSIGNED, RideStatus.ONGOING])
             )
         )
-        active_rides = list(result.scalars().all())
+        active_rides = result.all()
     
     if not active_rides:
         await update.message.reply_text("📋 No active rides at the moment.")
         return
     
-    message = "🚕 <b>Active Rides</b>\n\n"
-    
-    for ride in active_rides:
-        message += (
-            f"🆔 Ride #{ride.id}\n"
-            f"📊 Status: {ride.status.value}\n"
-            f"👤 Rider ID: {ride.rider_id}\n"
-        )
-        
-        if ride.driver_id:
-            message += f"🚗 Driver ID: {ride.driver_id}\n"
-        
-        message += "\n"
+    message = "🚕 <b>Active Rides</b>\n\n" + "".join(
+        f"🆔 Ride #{ride.id}\n"
+        f"📊 Status: {ride.status.value}\n"
+        f"👤 Rider ID: {ride.rider_id}\n"
+        + (f"🚗 Driver ID: {ride.driver_id}\n" if ride.driver_id else "")
+        + "\n"
+        for ride in active_rides
+    )
     
     await update.message.reply_text(message, parse_mode="HTML")
 
@@ -122,7 +150,7 @@ async def view_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View system statistics."""
     user = update.effective_user
     
-    if not await is_admin(user.id):
+    if not is_admin(user.id):
         await update.message.reply_text("❌ Unauthorized.")
         return
     
@@ -145,7 +173,7 @@ async def view_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def view_ride_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View completed ride history."""
-    if not await is_admin(update.effective_user.id):
+    if not is_admin(update.effective_user.id):
         return
         
     rides = await get_completed_rides(limit=10)
@@ -162,7 +190,7 @@ async def view_ride_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def view_cancelled_rides(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View cancelled ride history."""
-    if not await is_admin(update.effective_user.id):
+    if not is_admin(update.effective_user.id):
         return
         
     rides = await get_cancelled_rides(limit=10)
@@ -179,14 +207,14 @@ async def view_cancelled_rides(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def search_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Search user by ID stub."""
-    if not await is_admin(update.effective_user.id):
+    if not is_admin(update.effective_user.id):
         return
     await update.message.reply_text("🔍 Please provide the Telegram User ID (e.g., /search 123456789)")
 
 
 async def view_pending_drivers(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View pending driver applications."""
-    if not await is_admin(update.effective_user.id):
+    if not is_admin(update.effective_user.id):
         return
     
     drivers = await get_pending_drivers()
@@ -229,31 +257,27 @@ async def view_pending_drivers(update: Update, context: ContextTypes.DEFAULT_TYP
 async def approve_driver_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle admin approve button."""
     query = update.callback_query
-    await query.answer()
-    
-    if not await is_admin(query.from_user.id):
-        await query.edit_message_text("❌ Unauthorized.")
+    if not is_admin(query.from_user.id):
+        await asyncio.gather(query.answer(), query.edit_message_text("❌ Unauthorized."))
         return
     
-    driver_id = int(query.data.split("_")[-1])
-    success = await update_driver_status(driver_id, DriverStatus.APPROVED)
+    driver_id = int(context.matches[0].group(1))
+    _, success = await asyncio.gather(query.answer(), update_driver_status(driver_id, DriverStatus.APPROVED))
     
     if success:
         driver = await get_driver(driver_id)
         lang = driver.language_code if driver else "en"
+        # Notify the driver in the background; the outbox logs a failed send
+        outbox.submit(driver_id, partial(
+            context.bot.send_message,
+            chat_id=driver_id,
+            text=t("approved_msg", lang),
+            parse_mode="HTML"
+        ))
         await query.edit_message_text(
             f"✅ Driver <b>{driver.name}</b> (ID: {driver_id}) has been <b>APPROVED</b>.",
             parse_mode="HTML"
         )
-        # Notify the driver
-        try:
-            await context.bot.send_message(
-                chat_id=driver_id,
-                text=t("approved_msg", lang),
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
     else:
         await query.edit_message_text("❌ Failed to approve driver.")
 
@@ -261,52 +285,62 @@ async def approve_driver_callback(update: Update, context: ContextTypes.DEFAULT_
 async def reject_driver_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle admin reject button."""
     query = update.callback_query
-    await query.answer()
-    
-    if not await is_admin(query.from_user.id):
-        await query.edit_message_text("❌ Unauthorized.")
+    if not is_admin(query.from_user.id):
+        await asyncio.gather(query.answer(), query.edit_message_text("❌ Unauthorized."))
         return
     
-    driver_id = int(query.data.split("_")[-1])
-    success = await update_driver_status(driver_id, DriverStatus.REJECTED)
+    driver_id = int(context.matches[0].group(1))
+    _, success = await asyncio.gather(query.answer(), update_driver_status(driver_id, DriverStatus.REJECTED))
     
     if success:
         driver = await get_driver(driver_id)
         lang = driver.language_code if driver else "en"
+        # Notify the driver in the background; the outbox logs a failed send
+        outbox.submit(driver_id, partial(
+            context.bot.send_message,
+            chat_id=driver_id,
+            text=t("rejected_msg", lang),
+            parse_mode="HTML"
+        ))
         await query.edit_message_text(
             f"❌ Driver <b>{driver.name}</b> (ID: {driver_id}) has been <b>REJECTED</b>.",
             parse_mode="HTML"
         )
-        # Notify the driver
-        try:
-            await context.bot.send_message(
-                chat_id=driver_id,
-                text=t("rejected_msg", lang),
-                parse_mode="HTML"
-            )
-        except Exception:
-            pass
     else:
         await query.edit_message_text("❌ Failed to reject driver.")
 
 
 # ==================== Handler Setup ====================
 
+ADMIN_MENU_ACTIONS = {
+    "🛠 Admin": admin_panel,
+    "📋 Pending Drivers": view_pending_drivers,
+    "👥 All Drivers": view_all_drivers,
+    "🚕 Active Rides": view_active_rides,
+    "📋 Ride History": view_ride_history,
+    "❌ Cancelled Rides": view_cancelled_rides,
+    "📊 Statistics": view_statistics,
+    "🔍 Search User": search_user,
+}
+# Exact-text filter: a set membership test per message instead of a regex scan
+ADMIN_MENU_FILTER = filters.Text(frozenset(ADMIN_MENU_ACTIONS))
+APPROVE_DRIVER_PATTERN = re.compile(r"^approve_driver_(\d+)$")
+REJECT_DRIVER_PATTERN = re.compile(r"^reject_driver_(\d+)$")
+DRIVERS_PAGE_PATTERN = re.compile(r"^drivers_page_(\d+)$")
+
+
+async def dispatch_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route an admin menu button to its handler with a single dict lookup."""
+    return await ADMIN_MENU_ACTIONS[update.message.text](update, context)
+
+
 def setup_admin_handlers(application):
     """Register admin-related handlers."""
     
-    # Admin panel access
-    application.add_handler(MessageHandler(filters.Regex("^🛠 Admin$"), admin_panel))
-    
-    # Admin actions
-    application.add_handler(MessageHandler(filters.Regex("^📋 Pending Drivers$"), view_pending_drivers))
-    application.add_handler(MessageHandler(filters.Regex("^👥 All Drivers$"), view_all_drivers))
-    application.add_handler(MessageHandler(filters.Regex("^🚕 Active Rides$"), view_active_rides))
-    application.add_handler(MessageHandler(filters.Regex("^📋 Ride History$"), view_ride_history))
-    application.add_handler(MessageHandler(filters.Regex("^❌ Cancelled Rides$"), view_cancelled_rides))
-    application.add_handler(MessageHandler(filters.Regex("^📊 Statistics$"), view_statistics))
-    application.add_handler(MessageHandler(filters.Regex("^🔍 Search User$"), search_user))
+    # Admin panel access and menu actions: one exact-text filter, dispatched by table
+    application.add_handler(MessageHandler(ADMIN_MENU_FILTER, dispatch_admin_menu))
     
     # Admin inline callbacks
-    application.add_handler(CallbackQueryHandler(approve_driver_callback, pattern="^approve_driver_"))
-    application.add_handler(CallbackQueryHandler(reject_driver_callback, pattern="^reject_driver_"))
+    application.add_handler(CallbackQueryHandler(approve_driver_callback, pattern=APPROVE_DRIVER_PATTERN))
+    application.add_handler(CallbackQueryHandler(reject_driver_callback, pattern=REJECT_DRIVER_PATTERN))
+    application.add_handler(CallbackQueryHandler(drivers_page_callback, pattern=DRIVERS_PAGE_PATTERN))
@@ -2,8 +2,11 @@
 Driver handler for the Rideshare Bot.
 Manages driver registration, availability, and ride acceptance.
 """
+import asyncio
 import re
+from functools import partial
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import (
     ContextTypes, ConversationHandler, CommandHandler, 
     MessageHandler, CallbackQueryHandler, filters
@@ -11,23 +14,32 @@ from telegram.ext import (
 
 from database.db import (
     create_driver, get_driver, set_driver_availability,
-    get_active_ride_for_user, update_ride_status, get_ride
+    update_ride_status, get_ride
 )
 from enums import VehicleType, RideStatus, DriverStatus
 from fsm.driver_states import (
     DRIVER_REGISTERING_NAME, DRIVER_REGISTERING_PHONE, DRIVER_REGISTERING_VEHICLE,
     DRIVER_REGISTERING_PLATE, DRIVER_UPLOADING_LICENSE,
-    DRIVER_REGISTERING_LOCATION, DRIVER_IDLE, 
-    DRIVER_CONFIRMING_RIDE, DRIVER_ONGOING_RIDE
+    DRIVER_REGISTERING_LOCATION
 )
 from keyboards.reply import get_driver_menu_keyboard, get_vehicle_type_keyboard, get_location_keyboard, get_phone_keyboard
 from keyboards.inline import get_ride_action_keyboard, get_start_ride_keyboard
+from keyboards import buttons
 from services.location import get_google_maps_link, get_google_maps_route_link
-from services.notifications import notify_ride_started, notify_ride_completed
-from utils.logger import logger, log_with_context
+from services.notifications import notify_ride_started
+from services.outbox import outbox
+from utils.logger import logger
 from utils.validators import validate_name, validate_phone_number, normalize_phone_number
 from utils.i18n import t, get_all_translations
 
+# Labels of the get_vehicle_type_keyboard() buttons
+VEHICLE_BUTTONS = {
+    "🚗 Car": VehicleType.CAR,
+    "🏍 Motorcycle": VehicleType.MOTORCYCLE,
+    "🚐 Van": VehicleType.VAN,
+    "🛵 Bike": VehicleType.BIKE,
+}
+
 
 # ==================== Driver Registration Flow ====================
 
@@ -119,9 +131,7 @@ async def driver_phone_received(update: Update, context: ContextTypes.DEFAULT_TY
 async def driver_vehicle_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle vehicle selection."""
     text = update.message.text.strip()
-    v_map = {"🚗 Car": VehicleType.CAR, "🏍 Motorcycle": VehicleType.MOTORCYCLE, 
-             "🚐 Van": VehicleType.VAN, "🛵 Bike": VehicleType.BIKE}
-    v_type = v_map.get(text)
+    v_type = VEHICLE_BUTTONS.get(text)
     
     if not v_type:
         await update.message.reply_text("❌ Select from buttons:", reply_markup=get_vehicle_type_keyboard())
@@ -227,7 +237,18 @@ async def go_available(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    await set_driver_availability(user_id, True)
+    if not await set_driver_availability(user_id, True):
+        # The cached status may be stale (e.g. rejected through the admin API);
+        # the failed update dropped the cache entry, so this read is fresh
+        driver = await get_driver(user_id)
+        if driver and driver.status != DriverStatus.APPROVED:
+            await update.message.reply_text(t("driver_pending_error", lang), parse_mode="HTML")
+            return
+        await update.message.reply_text(
+            "🚕 You still have an active ride. Finish it before going available.",
+            parse_mode="HTML"
+        )
+        return
     await update.message.reply_text(
         "✅ <b>Status: AVAILABLE</b>\n\nYou will now receive nearby ride requests.",
         reply_markup=get_driver_menu_keyboard(True, lang),
@@ -258,9 +279,8 @@ async def driver_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not driver:
         return
         
-    from database.db import get_driver_today_rides, get_driver_completed_rides_count
-    today_rides = await get_driver_today_rides(user_id)
-    total_rides = await get_driver_completed_rides_count(user_id)
+    from database.db import get_driver_ride_counts
+    today_rides, total_rides = await get_driver_ride_counts(user_id)
     
     # Simulated earnings based on completed rides for demo purposes
     today_earnings = today_rides * 125.0  # Average 125 ETB per ride
@@ -328,10 +348,9 @@ async def driver_update_location(update: Update, context: ContextTypes.DEFAULT_T
 async def accept_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the 'Accept Ride' inline button."""
     query = update.callback_query
-    await query.answer()
-    
-    ride_id = int(query.data.split("_")[-1])
-    ride = await get_ride(ride_id)
+    ride_id = int(context.matches[0].group(2))
+    # Acknowledge the button while the ride is loaded
+    _, ride = await asyncio.gather(query.answer(), get_ride(ride_id))
     
     if not ride or ride.driver_id != update.effective_user.id or ride.status != RideStatus.ASSIGNED:
         await query.edit_message_text("❌ This ride is no longer available.")
@@ -354,28 +373,35 @@ async def accept_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def decline_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
-    ride_id = int(query.data.split("_")[-1])
-    ride = await get_ride(ride_id)
+    ride_id = int(context.matches[0].group(2))
+    _, ride = await asyncio.gather(query.answer(), get_ride(ride_id))
     if ride and ride.driver_id == update.effective_user.id and ride.status == RideStatus.ASSIGNED:
-        await update_ride_status(ride_id, RideStatus.CANCELLED)
-    await set_driver_availability(update.effective_user.id, True)
+        # The cancel (which also releases the driver) and the edit don't depend on each other.
+        # Both stay awaited: the DB write must finish inside this update's scope.
+        await asyncio.gather(
+            update_ride_status(ride_id, RideStatus.CANCELLED, expected_status=RideStatus.ASSIGNED),
+            query.edit_message_text("❌ Declined."),
+        )
+        return
     await query.edit_message_text("❌ Declined.")
 
 
 async def start_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
-
-    ride_id = int(query.data.split("_")[-1])
-    ride = await get_ride(ride_id)
+    ride_id = int(context.matches[0].group(2))
+    _, ride = await asyncio.gather(query.answer(), get_ride(ride_id))
 
     if not ride or ride.driver_id != update.effective_user.id or ride.status != RideStatus.ASSIGNED:
         await query.edit_message_text("❌ This ride cannot be started.")
         return
 
-    await update_ride_status(ride_id, RideStatus.ONGOING)
-    await notify_ride_started(context.bot, ride.rider_id, update.effective_user.id, ride_id)
+    # The cached ride may lag a concurrent tap or cancellation; only the winning transition proceeds
+    if not await update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED):
+        await query.edit_message_text("❌ This ride cannot be started.")
+        return
+
+    # The rider is notified in the background; only the driver's own edit is awaited
+    outbox.submit(ride.rider_id, partial(notify_ride_started, context.bot, ride.rider_id, update.effective_user.id, ride_id))
     await query.edit_message_text(
         "🚗 <b>Ride Started!</b>\n\nComplete the ride when you arrive.",
         reply_markup=get_ride_action_keyboard(ride_id, is_driver=True),
@@ -384,16 +410,17 @@ async def start_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def complete_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
-    ride_id = int(query.data.split("_")[-1])
-    ride = await get_ride(ride_id)
+    ride_id = int(context.matches[0].group(2))
+    _, ride = await asyncio.gather(query.answer(), get_ride(ride_id))
 
     if not ride or ride.driver_id != update.effective_user.id or ride.status != RideStatus.ONGOING:
         await query.edit_message_text("❌ This ride cannot be completed.")
         return
 
     # Phase 4 Payment Flow
-    await update_ride_status(ride_id, RideStatus.AWAITING_PAYMENT)
+    if not await update_ride_status(ride_id, RideStatus.AWAITING_PAYMENT, expected_status=RideStatus.ONGOING):
+        await query.edit_message_text("❌ This ride cannot be completed.")
+        return
     
     fare = ride.estimated_fare or 150.0
     
@@ -404,43 +431,65 @@ async def complete_ride_callback(update: Update, context: ContextTypes.DEFAULT_T
         f"💵 <b>Total Fare:</b> {fare} ETB\n\n"
         f"Please select your payment method to complete the ride:"
     )
-    try:
-        await context.bot.send_message(
-            chat_id=ride.rider_id, 
-            text=rider_msg, 
-            reply_markup=get_payment_keyboard(ride_id, fare),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        logger.error(f"Failed to send payment request to rider {ride.rider_id}: {e}")
-
+    
+    async def prompt_rider_payment():
+        try:
+            await context.bot.send_message(
+                chat_id=ride.rider_id, 
+                text=rider_msg, 
+                reply_markup=get_payment_keyboard(ride_id, fare),
+                parse_mode="HTML"
+            )
+        except RetryAfter:
+            raise  # the outbox waits out the flood limit and retries
+        except Exception as e:
+            logger.error("Failed to send payment request to rider %s: %s", ride.rider_id, e)
+    
+    outbox.submit(ride.rider_id, prompt_rider_payment)
     await query.edit_message_text("⏳ <b>Waiting for Payment...</b>\n\nThe rider has been prompted to pay the fare.", parse_mode="HTML")
 
 
-# ==================== Regex Helpers ====================
+RIDE_ACTIONS = {
+    "accept": accept_ride_callback,
+    "decline": decline_ride_callback,
+    "start": start_ride_callback,
+    "complete": complete_ride_callback,
+}
+RIDE_ACTION_PATTERN = re.compile(r"^(" + "|".join(RIDE_ACTIONS) + r")_ride_(\d+)$")
+
 
-def get_driver_start_regex() -> str:
-    options = get_all_translations("main_menu_driver")
-    return f"^({'|'.join(map(re.escape, options))})$"
+async def dispatch_ride_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a driver's ride button to its handler with a single dict lookup."""
+    return await RIDE_ACTIONS[context.matches[0].group(1)](update, context)
+
+
+# ==================== Regex Helpers ====================
 
-def get_go_available_regex() -> str:
-    options = get_all_translations("go_available")
-    return f"^({'|'.join(map(re.escape, options))})$"
+# Every language's label for a driver menu button -> its handler
+DRIVER_MENU_ACTIONS = {
+    label: handler
+    for key, handler in (("go_available", go_available), ("go_offline", go_offline), ("my_stats", driver_stats))
+    for label in get_all_translations(key)
+}
+# Exact-text filter: a set membership test per message instead of a regex scan
+DRIVER_MENU_FILTER = filters.Text(frozenset(DRIVER_MENU_ACTIONS))
 
-def get_go_offline_regex() -> str:
-    options = get_all_translations("go_offline")
-    return f"^({'|'.join(map(re.escape, options))})$"
 
-def get_my_stats_regex() -> str:
-    options = get_all_translations("my_stats")
-    return f"^({'|'.join(map(re.escape, options))})$"
+async def dispatch_driver_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a driver menu button to its handler with a single dict lookup."""
+    return await DRIVER_MENU_ACTIONS[update.message.text](update, context)
 
 
 # ==================== Handler Setup ====================
 
 def setup_driver_handlers(application):
+    """
+    Register driver handlers. The ride callbacks issue concurrent Bot API calls,
+    so the application should be built with a bot connection pool larger than
+    one (config.TELEGRAM_POOL_SIZE, applied in app.py).
+    """
     conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(get_driver_start_regex()), driver_start)],
+        entry_points=[MessageHandler(buttons.DRIVER_MENU, driver_start)],
         states={
             DRIVER_REGISTERING_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, driver_name_received)],
             DRIVER_REGISTERING_PHONE: [MessageHandler(filters.CONTACT | filters.TEXT & ~filters.COMMAND, driver_phone_received)],
@@ -456,15 +505,12 @@ def setup_driver_handlers(application):
         allow_reentry=True
     )
     application.add_handler(conv)
-    application.add_handler(MessageHandler(filters.Regex(get_go_available_regex()), go_available))
-    application.add_handler(MessageHandler(filters.Regex(get_go_offline_regex()), go_offline))
-    application.add_handler(MessageHandler(filters.Regex(get_my_stats_regex()), driver_stats))
-    application.add_handler(MessageHandler(filters.Regex("^💳 Wallet"), driver_wallet_menu))
+    # Available/offline/stats buttons in every language: one exact-text filter, dispatched by table
+    application.add_handler(MessageHandler(DRIVER_MENU_FILTER, dispatch_driver_menu))
+    application.add_handler(MessageHandler(buttons.WALLET, driver_wallet_menu))
     
     # Handle live location updates (or static location pins) when driver is not in conversation
     application.add_handler(MessageHandler(filters.LOCATION, driver_update_location))
     
-    application.add_handler(CallbackQueryHandler(accept_ride_callback, pattern="^accept_ride_"))
-    application.add_handler(CallbackQueryHandler(decline_ride_callback, pattern="^decline_ride_"))
-    application.add_handler(CallbackQueryHandler(start_ride_callback, pattern="^start_ride_"))
-    application.add_handler(CallbackQueryHandler(complete_ride_callback, pattern="^complete_ride_"))
+    # Accept/decline/start/complete buttons: one precompiled pattern, dispatched by table
+    application.add_handler(CallbackQueryHandler(dispatch_ride_action, pattern=RIDE_ACTION_PATTERN))
@@ -2,34 +2,50 @@
 Rider handler for the Rideshare Bot.
 Manages ride requests, status tracking, cancellations, and ratings.
 """
+import asyncio
 import re
+from functools import partial
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import (
-    ContextTypes, ConversationHandler, CommandHandler,
+    ContextTypes, ConversationHandler,
     MessageHandler, CallbackQueryHandler, filters
 )
 
 from database.db import (
-    create_rider, get_rider, create_ride, get_active_ride_for_user,
-    cancel_ride, add_ride_rating, get_ride, assign_driver_to_ride,
+    create_rider, get_rider, create_ride, get_active_ride_for_rider,
+    cancel_ride, cancel_own_ride, add_ride_rating, get_ride,
+    update_ride_status, update_wallet_balance,
     get_saved_locations, add_saved_location
 )
 from enums import RideStatus
 from fsm.rider_states import (
-    RIDER_IDLE, RIDER_REQUESTING_RIDE, RIDER_WAITING_DRIVER,
-    RIDER_RIDE_ASSIGNED, RIDER_ONGOING_RIDE, RIDER_RATING_DRIVER,
     RIDER_REGISTERING_PHONE, RIDER_MANAGING_FAVORITES, RIDER_SAVING_LOCATION_NAME,
     RIDER_WAITING_DESTINATION, RIDER_CONFIRMING_ROUTE
 )
-from keyboards.reply import get_rider_menu_keyboard, get_location_keyboard, get_phone_keyboard, get_main_menu_keyboard, get_favorites_keyboard
+from keyboards.reply import get_rider_menu_keyboard, get_location_keyboard, get_phone_keyboard, get_favorites_keyboard
 from keyboards.inline import get_cancel_ride_keyboard
+from keyboards import buttons
 from services.location import get_location_display
-from services.matching import find_nearest_driver
+from services.matching import assign_nearest_driver
 from services.notifications import notify_driver_assigned, notify_rider_assigned, notify_ride_cancelled
-from utils.logger import logger, log_with_context
+from services.outbox import outbox
+from utils.logger import logger
 from utils.i18n import t, get_all_translations
 from utils.validators import validate_phone_number, normalize_phone_number
-import asyncio
+from utils.cache import TTLCache
+
+# Route map URL -> Telegram file_id of the photo it produced, so a repeated route
+# is re-sent by id instead of Telegram fetching the image again
+route_map_file_ids = TTLCache(ttl=24 * 3600, maxsize=10_000)
+# Coordinates are rounded to ~11 m for the map; markers that close render identically
+MAP_COORD_PRECISION = 4
+
+# Riders who tapped Request Ride in the last couple of seconds; repeat taps are dropped
+recent_ride_requests = TTLCache(ttl=2.0)
+
+RIDE_STATUS_TEMPLATE = "🚕 <b>Ride Status (ID: {id})</b>\n\nStatus: {status}\n"
+RIDE_STATUS_DRIVER_TEMPLATE = "Driver: {name}\nVehicle: {vehicle}\n"
 
 
 # ==================== Rider Registration & Menu ====================
@@ -39,7 +55,8 @@ async def rider_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Start rider flow - check registration and show menu.
     """
     user = update.effective_user
-    rider = await get_rider(user.id)
+    # Independent reads: the active-ride probe overlaps the (usually cached) rider lookup
+    rider, active_ride = await asyncio.gather(get_rider(user.id), get_active_ride_for_rider(user.id))
     
     if not rider or not rider.phone_number:
         # Create rider without phone number first
@@ -56,9 +73,6 @@ async def rider_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return RIDER_REGISTERING_PHONE
     
     lang = rider.language_code
-    
-    # Check for active ride
-    active_ride = await get_active_ride_for_user(user.id)
     has_active_ride = active_ride is not None
     
     welcome_msg = t("welcome_rider", lang, name=rider.name)
@@ -122,11 +136,17 @@ async def request_ride_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     Handle ride request from rider - Ask for pickup location.
     """
     user = update.effective_user
-    rider = await get_rider(user.id)
+    if recent_ride_requests.get(user.id):
+        # Double tap: acknowledge without any DB I/O; returning None leaves the
+        # conversation in whatever state the first tap set
+        await update.message.reply_text("⏳ Please wait...")
+        return None
+    recent_ride_requests.set(user.id, True)
+    
+    rider, active_ride = await asyncio.gather(get_rider(user.id), get_active_ride_for_rider(user.id))
     lang = rider.language_code if rider else "en"
     
     # Check if rider already has an active ride
-    active_ride = await get_active_ride_for_user(user.id)
     if active_ride:
         await update.message.reply_text(
             f"❌ You already have an active ride (ID: {active_ride.id})!"
@@ -197,17 +217,19 @@ async def handle_destination(update: Update, context: ContextTypes.DEFAULT_TYPE)
     context.user_data['dest_lat'] = dest_lat
     context.user_data['dest_lng'] = dest_lng
     
-    from services.location import calculate_distance, get_route_static_map_url
+    from services.location import calculate_distance_precise, get_route_static_map_url
     from services.pricing import calculate_fare, calculate_eta
     
-    distance = calculate_distance(pickup_lat, pickup_lng, dest_lat, dest_lng)
+    distance = calculate_distance_precise(pickup_lat, pickup_lng, dest_lat, dest_lng)
     fare = calculate_fare(distance)
     eta = calculate_eta(distance)
     
     context.user_data['estimated_fare'] = fare
     context.user_data['estimated_duration'] = eta
     
-    map_url = get_route_static_map_url(pickup_lat, pickup_lng, dest_lat, dest_lng)
+    map_url = get_route_static_map_url(
+        *(round(c, MAP_COORD_PRECISION) for c in (pickup_lat, pickup_lng, dest_lat, dest_lng))
+    )
     
     from keyboards.inline import get_route_confirmation_keyboard
     
@@ -219,12 +241,14 @@ async def handle_destination(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"Do you want to confirm this ride?"
     )
     
-    await update.message.reply_photo(
-        photo=map_url,
+    message = await update.message.reply_photo(
+        photo=route_map_file_ids.get(map_url) or map_url,
         caption=caption,
         reply_markup=get_route_confirmation_keyboard(lang),
         parse_mode="HTML"
     )
+    if message.photo:
+        route_map_file_ids.set(map_url, message.photo[-1].file_id)
     return RIDER_CONFIRMING_ROUTE
 
 
@@ -233,10 +257,8 @@ async def confirm_route_callback(update: Update, context: ContextTypes.DEFAULT_T
     Handle route confirmation, create ride, and find driver.
     """
     query = update.callback_query
-    await query.answer()
-    
     user = query.from_user
-    rider = await get_rider(user.id)
+    _, rider = await asyncio.gather(query.answer(), get_rider(user.id))
     lang = rider.language_code if rider else "en"
     
     if query.data == "cancel_route":
@@ -264,24 +286,30 @@ async def confirm_route_callback(update: Update, context: ContextTypes.DEFAULT_T
         dest_lat, dest_lng, fare, eta
     )
     
-    # Matching Logic
-    match = await find_nearest_driver(pickup_lat, pickup_lng, ride.id)
+    # Matching Logic: claims the nearest driver still available, in distance order
+    match = await assign_nearest_driver(pickup_lat, pickup_lng, ride.id)
     
     if not match:
-        await query.edit_message_caption(t("no_drivers", lang), parse_mode="HTML")
-        await cancel_ride(ride.id)
+        await asyncio.gather(
+            query.edit_message_caption(t("no_drivers", lang), parse_mode="HTML"),
+            cancel_ride(ride.id),
+        )
         # In a real app, we'd keep searching or queue it
         return ConversationHandler.END
 
     driver, distance = match
-        
-    # Notify rider and driver
-    assigned = await assign_driver_to_ride(ride.id, driver.id, distance)
-    if not assigned:
-        await query.edit_message_caption("❌ Error assigning driver. Please try again.")
-        await cancel_ride(ride.id)
-        return ConversationHandler.END
 
+    # The driver's request goes out in the background; the rider is answered inline.
+    # Both helpers log their own send failures.
+    outbox.submit(driver.id, partial(
+        notify_rider_assigned,
+        context.bot,
+        driver.id,
+        user.first_name or "Rider",
+        get_location_display(pickup_lat, pickup_lng),
+        distance,
+        ride.id
+    ))
     await notify_driver_assigned(
         context.bot,
         user.id,
@@ -290,14 +318,6 @@ async def confirm_route_callback(update: Update, context: ContextTypes.DEFAULT_T
         distance,
         ride.id
     )
-    await notify_rider_assigned(
-        context.bot,
-        driver.id,
-        user.first_name or "Rider",
-        get_location_display(pickup_lat, pickup_lng),
-        distance,
-        ride.id
-    )
     
     return ConversationHandler.END
 
@@ -320,26 +340,25 @@ async def cancel_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def ride_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show status of active ride."""
     user_id = update.effective_user.id
-    ride = await get_active_ride_for_user(user_id)
+    ride = await get_active_ride_for_rider(user_id)
     
     if not ride:
         await update.message.reply_text("❌ No active ride.")
         return
 
-    status_text = (
-        f"🚕 <b>Ride Status (ID: {ride.id})</b>\n\n"
-        f"Status: {ride.status.value}\n"
-    )
+    status_text = RIDE_STATUS_TEMPLATE.format(id=ride.id, status=ride.status.value)
     if ride.driver:
-        status_text += f"Driver: {ride.driver.name}\nVehicle: {ride.driver.vehicle_type.value}\n"
-        
+        status_text += RIDE_STATUS_DRIVER_TEMPLATE.format(
+            name=ride.driver.name, vehicle=ride.driver.vehicle_type.value
+        )
+    
     await update.message.reply_text(status_text, parse_mode="HTML")
 
 
 async def cancel_ride_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the 'Cancel Ride' button."""
     user_id = update.effective_user.id
-    ride = await get_active_ride_for_user(user_id)
+    ride = await get_active_ride_for_rider(user_id)
     
     if not ride:
         await update.message.reply_text("❌ No active ride to cancel.")
@@ -354,62 +373,39 @@ async def cancel_ride_button(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def cancel_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle cancellation confirmation from inline keyboard."""
     query = update.callback_query
-    await query.answer()
-    
-    ride_id = int(query.data.split("_")[-1])
-    ride = await get_ride(ride_id)
+    ride_id = int(context.matches[0].group(1))
+    _, cancelled = await asyncio.gather(query.answer(), cancel_own_ride(ride_id, query.from_user.id))
     
-    if await cancel_ride(ride_id):
-        await query.edit_message_text("❌ Ride cancelled.")
-        if ride and ride.driver_id:
-            await notify_ride_cancelled(context.bot, ride.driver_id, ride_id)
-    else:
+    if cancelled is None:
         await query.edit_message_text("❌ Could not cancel ride.")
+        return
+    
+    if cancelled.driver_id:
+        outbox.submit(cancelled.driver_id, partial(notify_ride_cancelled, context.bot, cancelled.driver_id, ride_id))
+    await query.edit_message_text("❌ Ride cancelled.")
 
 
 async def rate_ride_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle rating callback."""
     query = update.callback_query
-    await query.answer()
+    match = context.matches[0]
+    ride_id, rating = int(match.group(1)), int(match.group(2))
     
-    data = query.data.split("_")
-    ride_id = int(data[1])
-    rating = int(data[2])
-    
-    await add_ride_rating(ride_id, rating)
+    # The confirmation doesn't depend on the write, so store the rating in the background
+    outbox.submit(query.from_user.id, partial(add_ride_rating, ride_id, rating, query.from_user.id))
     
     stars = "⭐" * rating
-    await query.edit_message_text(
-        f"✅ <b>Thank You!</b>\n\n"
-        f"You rated this ride: {stars}\n\n"
-        f"Your feedback helps us improve our service!",
-        parse_mode="HTML"
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(
+            f"✅ <b>Thank You!</b>\n\n"
+            f"You rated this ride: {stars}\n\n"
+            f"Your feedback helps us improve our service!",
+            parse_mode="HTML"
+        ),
     )
 
 
-# ==================== Regex Helpers ====================
-
-def get_rider_start_regex() -> str:
-    options = get_all_translations("main_menu_rider")
-    return f"^({'|'.join(map(re.escape, options))})$"
-
-def get_request_ride_regex() -> str:
-    options = get_all_translations("request_ride")
-    return f"^({'|'.join(map(re.escape, options))})$"
-
-def get_cancel_btn_regex() -> str:
-    options = get_all_translations("cancel_btn")
-    return f"^({'|'.join(map(re.escape, options))})$"
-
-def get_favorites_regex() -> str:
-    options = get_all_translations("favorites_menu")
-    return f"^({'|'.join(map(re.escape, options))})$"
-
-def get_back_regex() -> str:
-    options = get_all_translations("back_btn")
-    return f"^({'|'.join(map(re.escape, options))})$"
-
-
 # ==================== Favorites Flow ====================
 
 async def favorites_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -519,8 +515,7 @@ async def use_saved_location(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return RIDER_MANAGING_FAVORITES
     
     # Check if rider already has an active ride
-    from database.db import get_active_ride_for_user
-    active_ride = await get_active_ride_for_user(update.effective_user.id)
+    active_ride = await get_active_ride_for_rider(update.effective_user.id)
     if active_ride:
         await update.message.reply_text(
             f"❌ You already have an active ride (ID: {active_ride.id})!"
@@ -561,18 +556,17 @@ async def rider_wallet_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def process_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle rider payment selection."""
     query = update.callback_query
-    await query.answer()
-    
-    data = query.data.split("_")
-    payment_method = data[1] # cash, card, wallet
-    ride_id = int(data[2])
-    
-    from database.db import get_ride, update_ride_status, update_wallet_balance
-    from enums import RideStatus
+    # Not answered up front: an insufficient balance answers with an alert instead
+    match = context.matches[0]
+    payment_method = match.group(1)  # cash, card, wallet
+    ride_id = int(match.group(2))
     
     ride = await get_ride(ride_id)
     if not ride or ride.status != RideStatus.AWAITING_PAYMENT:
-        await query.edit_message_text("❌ This payment is no longer valid or already processed.")
+        await asyncio.gather(
+            query.answer(),
+            query.edit_message_text("❌ This payment is no longer valid or already processed."),
+        )
         return
         
     fare = ride.estimated_fare or 150.0
@@ -580,19 +574,26 @@ async def process_payment_callback(update: Update, context: ContextTypes.DEFAULT
     driver_id = ride.driver_id
     
     if payment_method == "wallet":
-        # Deduct from rider
         rider = await get_rider(rider_id)
         if getattr(rider, 'wallet_balance', 0.0) < fare:
             await query.answer("❌ Insufficient wallet balance!", show_alert=True)
             return
+    
+    # Mark ride completed first: only one of two racing payment taps wins, so money moves once
+    if not await update_ride_status(ride_id, RideStatus.COMPLETED, expected_status=RideStatus.AWAITING_PAYMENT):
+        await asyncio.gather(
+            query.answer(),
+            query.edit_message_text("❌ This payment is no longer valid or already processed."),
+        )
+        return
+    
+    if payment_method == "wallet":
+        # Deduct from rider
         await update_wallet_balance(rider_id, -fare, is_driver=False)
         
     if payment_method in ["wallet", "card"]:
         # Credit to driver
         await update_wallet_balance(driver_id, fare, is_driver=True)
-        
-    # Mark ride completed
-    await update_ride_status(ride_id, RideStatus.COMPLETED)
     
     # Notify rider with receipt and rating
     from keyboards.inline import get_rating_keyboard
@@ -602,7 +603,6 @@ async def process_payment_callback(update: Update, context: ContextTypes.DEFAULT
         f"💵 Amount: {fare:.2f} ETB\n\n"
         f"Please rate your driver:"
     )
-    await query.edit_message_text(receipt, reply_markup=get_rating_keyboard(ride_id), parse_mode="HTML")
     
     # Notify driver
     driver_msg = (
@@ -610,14 +610,40 @@ async def process_payment_callback(update: Update, context: ContextTypes.DEFAULT
         f"💵 Fare: {fare:.2f} ETB (Paid via {payment_method.capitalize()})\n\n"
         f"Great job!"
     )
-    from services.location import get_location_display
-    from database.db import set_driver_availability
-    await set_driver_availability(driver_id, True)
-    
-    try:
-        await context.bot.send_message(chat_id=driver_id, text=driver_msg, parse_mode="HTML")
-    except Exception as e:
-        logger.error(f"Failed to notify driver of payment: {e}")
+    async def notify_driver():
+        try:
+            await context.bot.send_message(chat_id=driver_id, text=driver_msg, parse_mode="HTML")
+        except RetryAfter:
+            raise  # the outbox waits out the flood limit and retries
+        except Exception as e:
+            logger.error("Failed to notify driver of payment: %s", e)
+    
+    outbox.submit(driver_id, notify_driver)
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(receipt, reply_markup=get_rating_keyboard(ride_id), parse_mode="HTML"),
+    )
+
+
+# Callback data is validated by the handler patterns, so malformed data never reaches a handler
+CANCEL_RIDE_CALLBACK_PATTERN = re.compile(r"^cancel_ride_(\d+)$")
+RATE_RIDE_CALLBACK_PATTERN = re.compile(r"^rate_(\d+)_([1-5])$")
+PAY_CALLBACK_PATTERN = re.compile(r"^pay_(cash|card|wallet)_(\d+)$")
+ROUTE_CONFIRM_PATTERN = re.compile(r"^(confirm|cancel)_route$")
+
+# Every language's label for a ride action button -> its handler
+RIDER_MENU_ACTIONS = {
+    label: handler
+    for key, handler in (("ride_status_btn", ride_status), ("cancel_ride_btn", cancel_ride_button))
+    for label in get_all_translations(key)
+}
+# Exact-text filter: a set membership test per message instead of a regex scan
+RIDER_MENU_FILTER = filters.Text(frozenset(RIDER_MENU_ACTIONS))
+
+
+async def dispatch_rider_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a rider ride-action button to its handler with a single dict lookup."""
+    return await RIDER_MENU_ACTIONS[update.message.text](update, context)
 
 
 # ==================== Handler Setup ====================
@@ -626,25 +652,25 @@ def setup_rider_handlers(application):
     """Register rider-related handlers."""
     # Rider menu entry & registration conversation
     rider_start_conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(get_rider_start_regex()), rider_start)],
+        entry_points=[MessageHandler(buttons.RIDER_MENU, rider_start)],
         states={
             RIDER_REGISTERING_PHONE: [
                 MessageHandler(filters.CONTACT | filters.TEXT & ~filters.COMMAND, rider_phone_received)
             ]
         },
-        fallbacks=[MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)],
+        fallbacks=[MessageHandler(buttons.CANCEL, cancel_request)],
         allow_reentry=True
     )
     application.add_handler(rider_start_conv)
     
     # Favorites conversation
     fav_conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(get_favorites_regex()), favorites_menu)],
+        entry_points=[MessageHandler(buttons.FAVORITES, favorites_menu)],
         states={
             RIDER_MANAGING_FAVORITES: [
                 MessageHandler(filters.LOCATION, save_location_start),
                 MessageHandler(filters.Regex("^\u2795 Save Current Location$"), save_location_prompt),
-                MessageHandler(filters.Regex(get_back_regex()), cancel_request),
+                MessageHandler(buttons.BACK, cancel_request),
                 MessageHandler(filters.Regex("^\U0001f4cd"), use_saved_location),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, cancel_request)
             ],
@@ -653,46 +679,45 @@ def setup_rider_handlers(application):
             ],
             RIDER_WAITING_DESTINATION: [
                 MessageHandler(filters.LOCATION, handle_destination),
-                MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)
+                MessageHandler(buttons.CANCEL, cancel_request)
             ],
             RIDER_CONFIRMING_ROUTE: [
-                CallbackQueryHandler(confirm_route_callback, pattern="^confirm_route$|^cancel_route$"),
-                MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)
+                CallbackQueryHandler(confirm_route_callback, pattern=ROUTE_CONFIRM_PATTERN),
+                MessageHandler(buttons.CANCEL, cancel_request)
             ]
         },
-        fallbacks=[MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)],
+        fallbacks=[MessageHandler(buttons.CANCEL, cancel_request)],
         allow_reentry=True
     )
     application.add_handler(fav_conv)
     
     # Ride Request Conversation
     ride_conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(get_request_ride_regex()), request_ride_start)],
+        entry_points=[MessageHandler(buttons.REQUEST_RIDE, request_ride_start)],
         states={
             WAITING_LOCATION: [
                 MessageHandler(filters.LOCATION, handle_location),
-                MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)
+                MessageHandler(buttons.CANCEL, cancel_request)
             ],
             RIDER_WAITING_DESTINATION: [
                 MessageHandler(filters.LOCATION, handle_destination),
-                MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)
+                MessageHandler(buttons.CANCEL, cancel_request)
             ],
             RIDER_CONFIRMING_ROUTE: [
-                CallbackQueryHandler(confirm_route_callback, pattern="^confirm_route$|^cancel_route$"),
-                MessageHandler(filters.Regex(get_cancel_btn_regex()), cancel_request)
+                CallbackQueryHandler(confirm_route_callback, pattern=ROUTE_CONFIRM_PATTERN),
+                MessageHandler(buttons.CANCEL, cancel_request)
             ]
         },
-        fallbacks=[MessageHandler(filters.Regex("^🏠|Main Menu"), cancel_request)], 
+        fallbacks=[MessageHandler(buttons.MAIN_MENU, cancel_request)], 
         allow_reentry=True
     )
     application.add_handler(ride_conv)
     
     # Ride actions
-    application.add_handler(MessageHandler(filters.Regex(get_all_translations("ride_status_btn")), ride_status))
-    application.add_handler(MessageHandler(filters.Regex(get_all_translations("cancel_ride_btn")), cancel_ride_button))
-    application.add_handler(MessageHandler(filters.Regex("^💳 Wallet"), rider_wallet_menu))
+    application.add_handler(MessageHandler(RIDER_MENU_FILTER, dispatch_rider_menu))
+    application.add_handler(MessageHandler(buttons.WALLET, rider_wallet_menu))
     
     # Callbacks
-    application.add_handler(CallbackQueryHandler(cancel_ride_callback, pattern="^cancel_ride_"))
-    application.add_handler(CallbackQueryHandler(rate_ride_callback, pattern="^rate_"))
-    application.add_handler(CallbackQueryHandler(process_payment_callback, pattern="^pay_"))
+    application.add_handler(CallbackQueryHandler(cancel_ride_callback, pattern=CANCEL_RIDE_CALLBACK_PATTERN))
+    application.add_handler(CallbackQueryHandler(rate_ride_callback, pattern=RATE_RIDE_CALLBACK_PATTERN))
+    application.add_handler(CallbackQueryHandler(process_payment_callback, pattern=PAY_CALLBACK_PATTERN))
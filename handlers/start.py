@@ -2,12 +2,13 @@
 Start handler for the Rideshare Bot.
 Handles welcome screen and role selection.
 """
+import asyncio
 import re
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from keyboards.reply import get_main_menu_keyboard
 from keyboards.inline import get_language_keyboard
-from database.db import set_user_language, get_rider, get_driver, get_rider_ride_count, get_driver_completed_rides_count, get_active_ride_for_user, cancel_ride
+from database.db import set_user_language, get_rider, get_driver, get_user_language, get_rider_ride_count, get_driver_completed_rides_count, get_active_ride_for_user, cancel_ride
 from utils.i18n import t, get_all_translations
 from utils.logger import logger, log_with_context
 from config import ADMIN_IDS
@@ -21,9 +22,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Get user language preference
-    db_user = await get_rider(user.id) or await get_driver(user.id)
+    lang = await get_user_language(user.id)
     
-    if not db_user:
+    if lang is None:
         # First time user
         welcome_message = t("welcome_first_time", "en", name=user.first_name)
         await update.message.reply_text(
@@ -35,10 +36,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             t("about_rideshare", "en"),
             parse_mode="HTML"
         )
-        log_with_context(logger, "INFO", f"New user {user.first_name} started bot", user_id=user.id)
+        log_with_context(logger, "INFO", "New user %s started bot", user.first_name, user_id=user.id)
         return
         
-    lang = db_user.language_code
     welcome_message = t("welcome_returning", lang, name=user.first_name)
     
     await update.message.reply_text(
@@ -47,14 +47,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode="HTML"
     )
     
-    log_with_context(logger, "INFO", f"User {user.first_name} started bot", user_id=user.id)
+    log_with_context(logger, "INFO", "User %s started bot", user.first_name, user_id=user.id)
 
 
 async def select_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show language selection menu."""
-    user = update.effective_user
-    db_user = await get_rider(user.id) or await get_driver(user.id)
-    lang = db_user.language_code if db_user else "en"
+    lang = await get_user_language(update.effective_user.id) or "en"
     
     await update.message.reply_text(
         t("select_language", lang),
@@ -66,13 +64,11 @@ async def select_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def set_language_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle language selection callback."""
     query = update.callback_query
-    await query.answer()
-    
-    lang_code = query.data.split("_")[-1]
+    lang_code = context.matches[0].group(1)
     user_id = update.effective_user.id
     
     # Update in DB
-    await set_user_language(user_id, lang_code)
+    await asyncio.gather(query.answer(), set_user_language(user_id, lang_code))
     
     # Notify user with updated language
     await query.edit_message_text(
@@ -94,17 +90,14 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Handle /help command - show help information based on user role.
     """
     user = update.effective_user
-    db_user = await get_driver(user.id) or await get_rider(user.id)
-    lang = db_user.language_code if db_user else "en"
+    driver, user_lang = await asyncio.gather(get_driver(user.id), get_user_language(user.id))
+    lang = user_lang or "en"
     
-    is_admin = user.id in ADMIN_IDS
-    is_driver = await get_driver(user.id) is not None
-    
-    if is_admin:
+    if user.id in ADMIN_IDS:
         help_text = t("help_admin", lang)
-    elif is_driver:
+    elif driver:
         help_text = t("help_driver", lang)
-    elif db_user: # Registered rider
+    elif user_lang: # Registered rider
         help_text = t("help_rider", lang)
     else:
         help_text = t("help_general", lang)
@@ -157,10 +150,10 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Global /cancel command - cancels any active operation and ride.
     """
     user = update.effective_user
-    db_user = await get_driver(user.id) or await get_rider(user.id)
-    lang = db_user.language_code if db_user else "en"
-    
-    active_ride = await get_active_ride_for_user(user.id)
+    user_lang, active_ride = await asyncio.gather(
+        get_user_language(user.id), get_active_ride_for_user(user.id)
+    )
+    lang = user_lang or "en"
     
     if active_ride:
         # Instead of direct cancel, prompt for confirmation (similar to cancel ride flow)
@@ -187,20 +180,24 @@ async def main_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await start_command(update, context)
 
 
-def get_lang_regex() -> str:
-    """Get regex for Language button in all languages."""
-    options = get_all_translations("main_menu_lang")
-    return f"^({'|'.join(map(re.escape, options))})$"
+SET_LANG_PATTERN = re.compile(r"^set_lang_([a-z]{2})$")
+
+# Every language's label for a start menu button -> its handler
+START_MENU_ACTIONS = {
+    label: handler
+    for key, handler in (
+        ("main_menu", main_menu_handler),
+        ("main_menu_help", help_command),
+        ("main_menu_lang", select_language),
+    )
+    for label in get_all_translations(key)
+}
+START_MENU_FILTER = filters.Text(frozenset(START_MENU_ACTIONS))
 
-def get_help_regex() -> str:
-    """Get regex for Help button in all languages."""
-    options = get_all_translations("main_menu_help")
-    return f"^({'|'.join(map(re.escape, options))})$"
 
-def get_home_regex() -> str:
-    """Get regex for Main Menu button in all languages."""
-    options = get_all_translations("main_menu")
-    return f"^({'|'.join(map(re.escape, options))})$"
+async def dispatch_start_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a start menu button to its handler with a single dict lookup."""
+    return await START_MENU_ACTIONS[update.message.text](update, context)
 
 
 # Handler setup function
@@ -211,7 +208,6 @@ def setup_start_handlers(application):
     application.add_handler(CommandHandler("profile", profile_command))
     application.add_handler(CommandHandler("cancel", cancel_command))
     
-    application.add_handler(MessageHandler(filters.Regex(get_home_regex()), main_menu_handler))
-    application.add_handler(MessageHandler(filters.Regex(get_help_regex()), help_command))
-    application.add_handler(MessageHandler(filters.Regex(get_lang_regex()), select_language))
-    application.add_handler(CallbackQueryHandler(set_language_callback, pattern="^set_lang_"))
+    # Home/help/language buttons in every language: one exact-text filter, dispatched by table
+    application.add_handler(MessageHandler(START_MENU_FILTER, dispatch_start_menu))
+    application.add_handler(CallbackQueryHandler(set_language_callback, pattern=SET_LANG_PATTERN))
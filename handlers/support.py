@@ -3,17 +3,16 @@ AI Support handler for the Rideshare Bot.
 Provides an interactive support flow where riders/drivers can ask for help
 and receive AI-powered responses.
 """
-import re
 from telegram import Update
 from telegram.ext import (
     ContextTypes, ConversationHandler, CommandHandler,
     MessageHandler, filters
 )
 
-from database.db import get_rider, get_driver, get_active_ride_for_user
-from services.ai_support import get_support_response, analyze_ride_issue
+from database.db import get_active_ride_for_user
+from services.ai_support import get_support_response
+from keyboards import buttons
 from utils.logger import logger
-from utils.i18n import t, get_all_translations
 
 
 # States
@@ -95,7 +94,7 @@ def setup_support_handlers(application):
         },
         fallbacks=[
             CommandHandler("cancel", support_cancel),
-            MessageHandler(filters.Regex("^(🏠|Main Menu|❌ Cancel)"), support_cancel),
+            MessageHandler(buttons.MAIN_MENU | buttons.CANCEL, support_cancel),
         ],
         allow_reentry=True,
     )
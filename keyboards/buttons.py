@@ -0,0 +1,24 @@
+"""
+Reply-keyboard button filters for the Rideshare Bot.
+One shared filter per button, matching its label in every loaded language.
+"""
+from telegram.ext import filters
+from utils.i18n import get_all_translations
+
+
+def button_filter(key: str) -> filters.Text:
+    """Exact-text filter for a button's label in any loaded language (one set lookup)."""
+    return filters.Text(frozenset(get_all_translations(key)))
+
+
+# Translations are loaded when utils.i18n is imported, so these are built once here
+# and every handler setup reuses the same instances
+MAIN_MENU = button_filter("main_menu")
+DRIVER_MENU = button_filter("main_menu_driver")
+RIDER_MENU = button_filter("main_menu_rider")
+REQUEST_RIDE = button_filter("request_ride")
+FAVORITES = button_filter("favorites_menu")
+CANCEL = button_filter("cancel_btn")
+BACK = button_filter("back_btn")
+# Not translated yet; both the driver and rider menus show it
+WALLET = filters.Text(frozenset({"💳 Wallet"}))
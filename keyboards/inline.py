@@ -2,8 +2,13 @@
 Inline keyboards for the Rideshare Bot.
 Provides contextual action buttons within messages.
 """
+from functools import lru_cache
+from typing import Optional
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
 
+# Keyboards that don't embed a ride/driver id are immutable and shared (see keyboards.reply);
+# per-ride keyboards are shown once or twice per ride, so caching them would not pay off.
+
 
 def get_ride_confirmation_keyboard(ride_id: int) -> InlineKeyboardMarkup:
     """
@@ -87,6 +92,7 @@ def get_start_ride_keyboard(ride_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=64)
 def get_language_keyboard() -> InlineKeyboardMarkup:
     """
     Language selection keyboard.
@@ -120,6 +126,7 @@ def get_driver_moderation_keyboard(driver_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=64)
 def get_route_confirmation_keyboard(lang: str = "en") -> InlineKeyboardMarkup:
     """
     Keyboard for rider to confirm or cancel the requested route.
@@ -149,3 +156,17 @@ def get_payment_keyboard(ride_id: int, fare: float) -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(keyboard)
 
+
+def get_drivers_page_keyboard(page: int, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    """
+    Pagination keyboard for the admin driver list.
+    
+    Layout:
+    [ ◀️ Prev ] [ Next ▶️ ]   (only the buttons that lead somewhere)
+    """
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton("◀️ Prev", callback_data=f"drivers_page_{page - 1}"))
+    if has_next:
+        row.append(InlineKeyboardButton("Next ▶️", callback_data=f"drivers_page_{page + 1}"))
+    return InlineKeyboardMarkup([row]) if row else None
@@ -2,10 +2,15 @@
 Reply keyboards for the Rideshare Bot.
 Provides persistent button menus for user navigation.
 """
+from functools import lru_cache
 from telegram import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from utils.i18n import t
 
+# Markups are immutable once built (PTB freezes TelegramObjects), so keyboards that
+# depend only on their arguments are built once per (state, language) and shared.
 
+
+@lru_cache(maxsize=64)
 def get_main_menu_keyboard(lang: str = "en") -> ReplyKeyboardMarkup:
     """
     Main menu keyboard shown after /start.
@@ -23,6 +28,7 @@ def get_main_menu_keyboard(lang: str = "en") -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=64)
 def get_driver_menu_keyboard(is_available: bool = False, lang: str = "en") -> ReplyKeyboardMarkup:
     """
     Driver menu keyboard.
@@ -42,6 +48,7 @@ def get_driver_menu_keyboard(is_available: bool = False, lang: str = "en") -> Re
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=64)
 def get_rider_menu_keyboard(has_active_ride: bool = False, lang: str = "en") -> ReplyKeyboardMarkup:
     """
     Rider menu keyboard.
@@ -61,6 +68,7 @@ def get_rider_menu_keyboard(has_active_ride: bool = False, lang: str = "en") ->
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=64)
 def get_vehicle_type_keyboard() -> ReplyKeyboardMarkup:
     """
     Vehicle type selection keyboard for driver registration.
@@ -73,6 +81,7 @@ def get_vehicle_type_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
 
 
+@lru_cache(maxsize=64)
 def get_location_keyboard(lang: str = "en") -> ReplyKeyboardMarkup:
     """
     Keyboard that requests the user's location.
@@ -84,6 +93,7 @@ def get_location_keyboard(lang: str = "en") -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
 
 
+@lru_cache(maxsize=64)
 def get_phone_keyboard(lang: str = "en") -> ReplyKeyboardMarkup:
     """
     Keyboard for phone number input with contact sharing and skip option.
@@ -101,6 +111,7 @@ def remove_keyboard() -> ReplyKeyboardRemove:
     return ReplyKeyboardRemove()
 
 
+@lru_cache(maxsize=64)
 def get_admin_menu_keyboard() -> ReplyKeyboardMarkup:
     """
     Admin panel keyboard with comprehensive management options.
@@ -64,6 +64,7 @@ async def seed_data():
         
         print("👥 Seeding Drivers...")
         for d in MOCK_DRIVERS:
+            total_rides = random.randint(10, 100) if d["status"] == DriverStatus.APPROVED else 0
             driver = Driver(
                 id=d["id"],
                 name=d["name"],
@@ -74,7 +75,8 @@ async def seed_data():
                 available=d["avail"],
                 status=d["status"],
                 rating=d["rating"],
-                total_rides=random.randint(10, 100) if d["status"] == DriverStatus.APPROVED else 0,
+                rating_sum=round(d["rating"] * total_rides),
+                total_rides=total_rides,
                 language_code="en",
                 plate_number=f"A{random.randint(10000, 99999)}"
             )
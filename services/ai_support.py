@@ -7,8 +7,8 @@ Note: In production, this would integrate with OpenAI/Gemini API.
 For the portfolio demo, we use deterministic, rule-based intelligence
 that demonstrates the product thinking behind AI-assisted operations.
 """
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from datetime import datetime
+from typing import List, Dict
 import random
 
 
@@ -1,13 +1,14 @@
 """
 Location utilities for the Rideshare Bot.
-Provides real GPS support, geopy distance calculations, and map integration.
+Provides real GPS support, distance calculations, and map integration.
 """
-import random
 import math
+import random
 from typing import Tuple
-from geopy.distance import geodesic
 from config import CITY_LAT_MIN, CITY_LAT_MAX, CITY_LNG_MIN, CITY_LNG_MAX
 
+EARTH_RADIUS_KM = 6371.0
+
 
 def generate_random_location() -> Tuple[float, float]:
     """
@@ -20,27 +21,37 @@ def generate_random_location() -> Tuple[float, float]:
 
 
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Approximate distance between two points with the equirectangular projection.
+    Within about 1% of the geodesic for city-scale distances, at a fraction of
+    the cost; used to rank drivers. Returns distance in kilometers.
+    """
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) * 0.5))
+    y = math.radians(lat2 - lat1)
+    return round(EARTH_RADIUS_KM * math.sqrt(x * x + y * y), 2)
+
+
+def calculate_distance_precise(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """
     Calculate distance between two points using Geodesic (precise) formula.
-    Returns distance in kilometers.
+    Used where the distance is charged for. Returns distance in kilometers.
     """
+    # Imported here so only fare quotes pay for loading geopy
+    from geopy.distance import geodesic
     return round(geodesic((lat1, lng1), (lat2, lng2)).kilometers, 2)
 
 
 def format_distance(distance_km: float) -> str:
     """Format distance for display."""
     if distance_km < 1.0:
-        meters = int(distance_km * 1000)
-        return f"{meters} m"
-    else:
-        return f"{distance_km:.1f} km"
+        return "%d m" % (distance_km * 1000)
+    return "%.1f km" % distance_km
 
 
 def get_location_display(lat: float, lng: float) -> str:
     """Format coordinates for display."""
-    lat_dir = "N" if lat >= 0 else "S"
-    lng_dir = "E" if lng >= 0 else "W"
-    return f"{abs(lat):.3f}°{lat_dir}, {abs(lng):.3f}°{lng_dir}"
+    # Hemisphere letters indexed by sign (False -> N/E, True -> S/W)
+    return "%.3f°%s, %.3f°%s" % (abs(lat), "NS"[lat < 0], abs(lng), "EW"[lng < 0])
 
 
 def get_google_maps_link(lat: float, lng: float) -> str:
@@ -67,6 +78,3 @@ def get_route_static_map_url(lat1: float, lng1: float, lat2: float, lng2: float)
 def get_google_maps_route_link(lat1: float, lng1: float, lat2: float, lng2: float) -> str:
     """Generate a Google Maps routing link for drivers."""
     return f"https://www.google.com/maps/dir/?api=1&origin={lat1},{lng1}&destination={lat2},{lng2}"
-
-
-
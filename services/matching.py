@@ -2,45 +2,32 @@
 Driver matching service for the Rideshare Bot.
 Implements smart driver selection based on distance and availability.
 """
+import heapq
+from operator import itemgetter
 from typing import Optional, List, Tuple
-from database.models import Driver
-from database.db import get_available_drivers
+from database.db import get_candidate_drivers, assign_driver_to_ride
+from database.driver_index import DriverPosition
 from services.location import calculate_distance
-from config import MAX_SEARCH_DISTANCE_KM
+from config import MAX_SEARCH_DISTANCE_KM, MATCH_ATTEMPTS
 from utils.logger import logger, log_with_context
 
+_by_distance = itemgetter(1)
 
-async def find_nearest_driver(rider_lat: float, rider_lng: float, 
-                              ride_id: Optional[int] = None) -> Optional[Tuple[Driver, float]]:
-    """
-    Find the nearest available driver to a rider's location.
-    
-    Algorithm:
-    1. Get all available drivers (available=True)
-    2. Calculate Euclidean distance for each driver
-    3. Filter drivers within MAX_SEARCH_DISTANCE_KM
-    4. Sort by distance (ascending)
-    5. Return nearest driver or None
-    
-    Args:
-        rider_lat: Rider's pickup latitude
-        rider_lng: Rider's pickup longitude
-        ride_id: Optional ride ID for logging
-    
-    Returns:
-        Tuple of (Driver, distance_km) or None if no drivers available
-    """
-    # Get all available drivers
-    drivers = await get_available_drivers()
+
+async def _drivers_by_distance(rider_lat: float, rider_lng: float,
+                               ride_id: Optional[int] = None) -> List[Tuple[DriverPosition, float]]:
+    """Available drivers within MAX_SEARCH_DISTANCE_KM of the rider, with their distances (unordered)."""
+    # Get nearby available drivers; the index does the coarse spatial filtering
+    drivers = await get_candidate_drivers(rider_lat, rider_lng, MAX_SEARCH_DISTANCE_KM)
     
     if not drivers:
         log_with_context(logger, "INFO", 
                         "No available drivers found", 
                         ride_id=ride_id)
-        return None
+        return []
     
     # Calculate distances for all drivers
-    driver_distances: List[Tuple[Driver, float]] = []
+    driver_distances: List[Tuple[DriverPosition, float]] = []
     
     for driver in drivers:
         distance = calculate_distance(
@@ -54,20 +41,39 @@ async def find_nearest_driver(rider_lat: float, rider_lng: float,
     
     if not driver_distances:
         log_with_context(logger, "INFO", 
-                        f"No drivers within {MAX_SEARCH_DISTANCE_KM} km", 
+                        "No drivers within %s km", MAX_SEARCH_DISTANCE_KM,
                         ride_id=ride_id)
-        return None
+        return []
     
-    # Sort by distance (nearest first)
-    driver_distances.sort(key=lambda x: x[1])
+    return driver_distances
+
+
+async def assign_nearest_driver(rider_lat: float, rider_lng: float, ride_id: int,
+                                max_attempts: int = MATCH_ATTEMPTS) -> Optional[Tuple[DriverPosition, float]]:
+    """
+    Assign the nearest driver who can still be claimed to the ride.
     
-    nearest_driver, distance = driver_distances[0]
+    assign_driver_to_ride is a guarded compare-and-set, so losing a driver to a
+    concurrent request just moves on to the next-nearest candidate instead of
+    failing the whole request.
     
-    log_with_context(logger, "INFO", 
-                    f"Found nearest driver: {nearest_driver.name} ({distance} km away)", 
-                    ride_id=ride_id, user_id=nearest_driver.id)
+    Returns:
+        Tuple of (driver row, distance_km) for the assigned driver, or None if
+        no candidate could be claimed (or the ride is no longer REQUESTED).
+    """
+    driver_distances = await _drivers_by_distance(rider_lat, rider_lng, ride_id)
     
-    return nearest_driver, distance
+    # Only the first few candidates are ever tried, so skip sorting the rest
+    for driver, distance in heapq.nsmallest(max_attempts, driver_distances, key=_by_distance):
+        if await assign_driver_to_ride(ride_id, driver.id, distance):
+            log_with_context(logger, "INFO", 
+                            "Assigned driver: %s (%s km away)", driver.name, distance,
+                            ride_id=ride_id, user_id=driver.id)
+            return driver, distance
+        log_with_context(logger, "INFO", 
+                        "Driver was claimed concurrently, trying next candidate", 
+                        ride_id=ride_id, user_id=driver.id)
+    return None
 
 
 async def get_driver_stats(driver_id: int) -> dict:
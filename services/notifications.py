@@ -2,15 +2,48 @@
 Notification service for the Rideshare Bot.
 Centralized system for sending notifications to users.
 """
-from typing import Optional
-from telegram import Bot
+import asyncio
+from typing import Optional, Sequence, Tuple
+from telegram import Bot, InlineKeyboardMarkup
 from telegram.constants import ParseMode
+from telegram.error import RetryAfter
 from keyboards.inline import get_ride_confirmation_keyboard, get_rating_keyboard
 from database.db import get_ride
 from services.location import get_location_display
 from utils.logger import logger, log_with_context
 from utils.i18n import t
 
+# (chat_id, text, reply_markup or None)
+OutgoingMessage = Tuple[int, str, Optional[InlineKeyboardMarkup]]
+
+
+async def _send_to_parties(bot: Bot, ride_id: int, event: str,
+                           messages: Sequence[OutgoingMessage]) -> None:
+    """
+    Send a ride event to several chats at once. A failure for one party is logged
+    on its own and doesn't stop or hide the delivery to the others. A single-chat
+    send re-raises RetryAfter so the outbox can wait out the flood limit and retry;
+    with several chats a retry would repeat the message to the parties that got it.
+    """
+    results = await asyncio.gather(
+        *(
+            bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.HTML, reply_markup=markup)
+            for chat_id, text, markup in messages
+        ),
+        return_exceptions=True,
+    )
+    if len(messages) == 1 and isinstance(results[0], RetryAfter):
+        raise results[0]
+    failed = False
+    for (chat_id, _, _), result in zip(messages, results):
+        if isinstance(result, Exception):
+            failed = True
+            log_with_context(logger, "ERROR",
+                            "Failed to send %s notification: %s", event, result,
+                            ride_id=ride_id, user_id=chat_id)
+    if not failed:
+        log_with_context(logger, "INFO", "Ride %s notifications sent", event, ride_id=ride_id)
+
 
 async def notify_driver_assigned(bot: Bot, rider_id: int, driver_name: str, 
                                  vehicle_type: str, distance: float, ride_id: int):
@@ -44,7 +77,7 @@ async def notify_driver_assigned(bot: Bot, rider_id: int, driver_name: str,
                         ride_id=ride_id, user_id=rider_id)
     except Exception as e:
         log_with_context(logger, "ERROR", 
-                        f"Failed to notify rider: {e}", 
+                        "Failed to notify rider: %s", e,
                         ride_id=ride_id, user_id=rider_id)
 
 
@@ -79,9 +112,11 @@ async def notify_rider_assigned(bot: Bot, driver_id: int, rider_name: str,
         log_with_context(logger, "INFO", 
                         "Driver notified of ride assignment", 
                         ride_id=ride_id, user_id=driver_id)
+    except RetryAfter:
+        raise  # queued on the outbox, which waits out the flood limit and retries
     except Exception as e:
         log_with_context(logger, "ERROR", 
-                        f"Failed to notify driver: {e}", 
+                        "Failed to notify driver: %s", e,
                         ride_id=ride_id, user_id=driver_id)
 
 
@@ -90,12 +125,10 @@ async def notify_ride_started(bot: Bot, rider_id: int, driver_id: int, ride_id:
     rider_message = "🚗 <b>Ride Started!</b>\n\nYour ride is now in progress. Have a safe journey!"
     driver_message = "🚗 <b>Ride Started!</b>\n\nRide is now in progress."
     
-    try:
-        await bot.send_message(chat_id=rider_id, text=rider_message, parse_mode=ParseMode.HTML)
-        await bot.send_message(chat_id=driver_id, text=driver_message, parse_mode=ParseMode.HTML)
-        log_with_context(logger, "INFO", "Ride started notifications sent", ride_id=ride_id)
-    except Exception as e:
-        log_with_context(logger, "ERROR", f"Failed to send ride started notifications: {e}", ride_id=ride_id)
+    await _send_to_parties(bot, ride_id, "started", [
+        (rider_id, rider_message, None),
+        (driver_id, driver_message, None),
+    ])
 
 
 async def notify_ride_completed(bot: Bot, rider_id: int, driver_id: int, ride_id: int):
@@ -106,11 +139,10 @@ async def notify_ride_completed(bot: Bot, rider_id: int, driver_id: int, ride_id
         # Fallback to generic message
         rider_message = "✅ <b>Ride Completed!</b>\n\nThank you for using RideShare Bot. Please rate your driver."
         driver_message = "✅ <b>Ride Completed!</b>\n\nRide has been completed successfully."
-        try:
-            await bot.send_message(chat_id=rider_id, text=rider_message, parse_mode=ParseMode.HTML, reply_markup=get_rating_keyboard(ride_id))
-            await bot.send_message(chat_id=driver_id, text=driver_message, parse_mode=ParseMode.HTML)
-        except Exception as e:
-            logger.error(f"Failed to send generic completed notifications: {e}")
+        await _send_to_parties(bot, ride_id, "completed", [
+            (rider_id, rider_message, get_rating_keyboard(ride_id)),
+            (driver_id, driver_message, None),
+        ])
         return
 
     # Simulate calculations for demo
@@ -149,21 +181,10 @@ async def notify_ride_completed(bot: Bot, rider_id: int, driver_id: int, ride_id
         fare=f"{fare:.2f}"
     )
     
-    try:
-        await bot.send_message(
-            chat_id=rider_id,
-            text=rider_message,
-            parse_mode=ParseMode.HTML,
-            reply_markup=get_rating_keyboard(ride_id)
-        )
-        await bot.send_message(
-            chat_id=driver_id, 
-            text=driver_message, 
-            parse_mode=ParseMode.HTML
-        )
-        log_with_context(logger, "INFO", "Ride completed receipts sent", ride_id=ride_id)
-    except Exception as e:
-        log_with_context(logger, "ERROR", f"Failed to send ride completed receipts: {e}", ride_id=ride_id)
+    await _send_to_parties(bot, ride_id, "completed", [
+        (rider_id, rider_message, get_rating_keyboard(ride_id)),
+        (driver_id, driver_message, None),
+    ])
 
 
 async def notify_ride_cancelled(bot: Bot, user_id: int, ride_id: int, 
@@ -177,17 +198,7 @@ async def notify_ride_cancelled(bot: Bot, user_id: int, ride_id: int,
         ride_id: Ride ID
         other_party_id: Optional ID of other party to notify
     """
-    message = "❌ <b>Ride Cancelled</b>\n\nThe ride has been cancelled."
-    
-    try:
-        await bot.send_message(chat_id=user_id, text=message, parse_mode=ParseMode.HTML)
-        
-        if other_party_id:
-            other_message = "❌ <b>Ride Cancelled</b>\n\nThe other party has cancelled the ride."
-            await bot.send_message(chat_id=other_party_id, text=other_message, parse_mode=ParseMode.HTML)
-        
-        log_with_context(logger, "INFO", "Ride cancellation notifications sent", 
-                        ride_id=ride_id, user_id=user_id)
-    except Exception as e:
-        log_with_context(logger, "ERROR", f"Failed to send cancellation notifications: {e}", 
-                        ride_id=ride_id, user_id=user_id)
+    messages = [(user_id, "❌ <b>Ride Cancelled</b>\n\nThe ride has been cancelled.", None)]
+    if other_party_id:
+        messages.append((other_party_id, "❌ <b>Ride Cancelled</b>\n\nThe other party has cancelled the ride.", None))
+    await _send_to_parties(bot, ride_id, "cancelled", messages)
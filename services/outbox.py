@@ -0,0 +1,85 @@
+"""
+Outgoing message queue for the Rideshare Bot.
+Sends notifications to other chats in the background so handlers don't wait on them.
+"""
+import asyncio
+import contextvars
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from telegram.error import RetryAfter
+
+from config import OUTBOX_CONCURRENCY
+from utils.logger import logger
+
+Send = Callable[[], Awaitable[Any]]
+
+
+class Outbox:
+    """
+    Per-chat FIFO of pending Bot API sends.
+
+    Each chat with queued sends gets one worker task that runs them in order and
+    exits once its queue is empty, so different chats send concurrently while
+    messages to the same chat keep their order. Workers run in a fresh context:
+    they outlive the update that queued them, so they must not inherit its
+    database scope. Other side effects the reply shouldn't wait on (such as
+    storing a rating) can be queued under the user's chat the same way.
+
+    `max_in_flight` caps how many sends run at once across all chats, so a large
+    fan-out waits here instead of draining the Bot API connection pool. When
+    Telegram answers a send with RetryAfter, that chat's queue waits out the
+    cooldown without holding a slot and retries the send once, so one
+    flood-limited chat doesn't stall the others.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        self._queues: Dict[int, Deque[Send]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+
+    def submit(self, chat_id: int, send: Send) -> None:
+        """Queue `send` (a zero-argument coroutine function) for delivery to `chat_id`."""
+        self._queues.setdefault(chat_id, deque()).append(send)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(
+                self._drain(chat_id), context=contextvars.Context()
+            )
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                send = queue.popleft()
+                try:
+                    try:
+                        await self._run(send)
+                    except RetryAfter as exc:
+                        logger.warning("Chat %s is flood limited; pausing its sends for %ss",
+                                       chat_id, exc.retry_after)
+                        await asyncio.sleep(exc.retry_after)
+                        await self._run(send)
+                except Exception:
+                    logger.exception("Queued send to chat %s failed", chat_id)
+        finally:
+            # No await between the empty check and here, so no submit can slip in
+            del self._queues[chat_id]
+            del self._workers[chat_id]
+
+    async def _run(self, send: Send) -> None:
+        if self._slots is None:
+            await send()
+        else:
+            async with self._slots:
+                await send()
+
+    async def flush(self, timeout: float = None) -> None:
+        """Wait for queued sends to finish (e.g. before shutting the bot down)."""
+        if self._workers:
+            await asyncio.wait(list(self._workers.values()), timeout=timeout)
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+
+outbox = Outbox(max_in_flight=OUTBOX_CONCURRENCY)
@@ -0,0 +1,56 @@
+"""
+Unit tests for the in-process TTL cache.
+Tests hits, expiry, invalidation, and size-bounded eviction.
+"""
+from unittest.mock import patch
+from utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for TTLCache behaviour."""
+
+    def test_get_missing_returns_none(self):
+        cache = TTLCache(ttl=60)
+        assert cache.get(1) is None
+
+    def test_set_then_get(self):
+        cache = TTLCache(ttl=60)
+        cache.set(1, "driver")
+        assert cache.get(1) == "driver"
+
+    def test_entry_expires(self):
+        cache = TTLCache(ttl=10)
+        with patch("utils.cache.time.monotonic", return_value=100.0):
+            cache.set(1, "driver")
+        with patch("utils.cache.time.monotonic", return_value=105.0):
+            assert cache.get(1) == "driver"
+        with patch("utils.cache.time.monotonic", return_value=111.0):
+            assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_pop_invalidates(self):
+        cache = TTLCache(ttl=60)
+        cache.set(1, "driver")
+        cache.pop(1)
+        assert cache.get(1) is None
+
+    def test_pop_missing_is_noop(self):
+        cache = TTLCache(ttl=60)
+        cache.pop(42)
+        assert len(cache) == 0
+
+    def test_oldest_evicted_when_full(self):
+        cache = TTLCache(ttl=60, maxsize=2)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.set(3, "c")
+        assert cache.get(1) is None
+        assert cache.get(2) == "b"
+        assert cache.get(3) == "c"
+
+    def test_clear(self):
+        cache = TTLCache(ttl=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.clear()
+        assert len(cache) == 0
@@ -0,0 +1,266 @@
+"""
+Database tests for the ride state transitions.
+Runs against the SQLite test database; tests guarded status changes, driver release,
+the APPROVED guard on availability, ownership checks on cancellation, once-only ride
+ratings, and the migration of a baseline-schema database.
+"""
+import asyncio
+import itertools
+import os
+import sqlite3
+import time
+
+# Override database to use test DB before importing the db module
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test_rideshare.db"
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database.db as db
+from database.db import (
+    init_db, create_driver, create_rider, create_ride, update_driver_status, set_driver_availability,
+    assign_driver_to_ride, update_ride_status, cancel_own_ride, add_ride_rating, get_ride, get_driver,
+    get_candidate_drivers, get_active_ride_for_rider, get_schema_version, SCHEMA_VERSION,
+)
+from database.models import Driver
+from enums import DriverStatus, RideStatus, VehicleType
+
+# The test database outlives a run, so start user ids somewhere previous runs didn't use
+_user_ids = itertools.count(time.time_ns() // 1000)
+
+PICKUP = (9.03, 38.75)
+
+
+@pytest.fixture(autouse=True)
+async def setup_db():
+    await init_db()
+    yield
+
+
+async def _available_driver() -> int:
+    driver_id = next(_user_ids)
+    await create_driver(driver_id, "Test Driver", VehicleType.CAR, *PICKUP)
+    await update_driver_status(driver_id, DriverStatus.APPROVED)
+    assert await set_driver_availability(driver_id, True)
+    return driver_id
+
+
+async def _assigned_ride(driver_id: int = None):
+    """(ride_id, rider_id, driver_id) for a fresh ride in ASSIGNED, to a new driver by default."""
+    rider_id = next(_user_ids)
+    await create_rider(rider_id, "Test Rider")
+    ride = await create_ride(rider_id, *PICKUP)
+    if driver_id is None:
+        driver_id = await _available_driver()
+    assert await assign_driver_to_ride(ride.id, driver_id, 0.5)
+    return ride.id, rider_id, driver_id
+
+
+async def _completed_ride(driver_id: int = None):
+    ride_id, rider_id, driver_id = await _assigned_ride(driver_id)
+    assert await update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED)
+    assert await update_ride_status(ride_id, RideStatus.COMPLETED, expected_status=RideStatus.ONGOING)
+    return ride_id, rider_id, driver_id
+
+
+async def _status(ride_id: int) -> RideStatus:
+    return (await get_ride(ride_id, cached=False)).status
+
+
+class TestUpdateRideStatus:
+    """Tests for the compare-and-set in update_ride_status."""
+
+    async def test_racing_transitions_only_one_wins(self):
+        ride_id, _, _ = await _assigned_ride()
+        results = await asyncio.gather(
+            update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED),
+            update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED),
+        )
+        assert sorted(results) == [False, True]
+        assert await _status(ride_id) == RideStatus.ONGOING
+
+    async def test_wrong_expected_status_leaves_ride_unchanged(self):
+        ride_id, _, _ = await _assigned_ride()
+        assert not await update_ride_status(ride_id, RideStatus.COMPLETED, expected_status=RideStatus.ONGOING)
+        assert await _status(ride_id) == RideStatus.ASSIGNED
+
+    async def test_finished_ride_releases_driver(self):
+        ride_id, _, driver_id = await _assigned_ride()
+        assert not (await get_driver(driver_id)).available
+        assert await update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED)
+        assert await update_ride_status(ride_id, RideStatus.COMPLETED, expected_status=RideStatus.ONGOING)
+        ride = await get_ride(ride_id, cached=False)
+        assert ride.status == RideStatus.COMPLETED and ride.completed_at is not None
+        assert (await get_driver(driver_id)).available
+        assert driver_id in [d.id for d in await get_candidate_drivers(*PICKUP, radius_km=1)]
+
+
+async def _reject_elsewhere(driver_id: int) -> None:
+    """Reject a driver the way the admin API process does: this process's cache isn't told."""
+    async with db.get_session() as session:
+        await session.execute(update(Driver).where(Driver.id == driver_id).values(status=DriverStatus.REJECTED))
+        await session.commit()
+
+
+class TestApprovedGuard:
+    """Tests that a driver rejected by another process can't become or stay matchable."""
+
+    async def test_stale_cache_cannot_make_rejected_driver_available(self):
+        driver_id = await _available_driver()
+        assert await set_driver_availability(driver_id, False)
+        assert (await get_driver(driver_id)).status == DriverStatus.APPROVED
+        await _reject_elsewhere(driver_id)
+        assert (await get_driver(driver_id)).status == DriverStatus.APPROVED  # stale cache
+        assert not await set_driver_availability(driver_id, True)
+        assert not (await get_driver(driver_id)).available
+
+    async def test_rejected_driver_cannot_be_claimed(self):
+        driver_id = await _available_driver()
+        await _reject_elsewhere(driver_id)
+        rider_id = next(_user_ids)
+        await create_rider(rider_id, "Test Rider")
+        ride = await create_ride(rider_id, *PICKUP)
+        assert not await assign_driver_to_ride(ride.id, driver_id, 0.5)
+        assert await _status(ride.id) == RideStatus.REQUESTED
+
+    async def test_driver_rejected_mid_ride_is_not_released(self):
+        ride_id, _, driver_id = await _assigned_ride()
+        await update_driver_status(driver_id, DriverStatus.REJECTED)
+        assert await update_ride_status(ride_id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED)
+        assert await update_ride_status(ride_id, RideStatus.COMPLETED, expected_status=RideStatus.ONGOING)
+        assert not (await get_driver(driver_id)).available
+        assert driver_id not in [d.id for d in await get_candidate_drivers(*PICKUP, radius_km=1)]
+
+
+class TestCancelOwnRide:
+    """Tests for the ownership and status guards on rider cancellation."""
+
+    async def test_foreign_rider_cannot_cancel(self):
+        ride_id, _, driver_id = await _assigned_ride()
+        assert await cancel_own_ride(ride_id, next(_user_ids)) is None
+        assert await _status(ride_id) == RideStatus.ASSIGNED
+        assert not (await get_driver(driver_id)).available
+
+    async def test_own_cancel_releases_driver_once(self):
+        ride_id, rider_id, driver_id = await _assigned_ride()
+        cancelled = await cancel_own_ride(ride_id, rider_id)
+        assert cancelled is not None and cancelled.driver_id == driver_id
+        assert await _status(ride_id) == RideStatus.CANCELLED
+        assert (await get_driver(driver_id)).available
+        assert await cancel_own_ride(ride_id, rider_id) is None
+
+
+class TestAddRideRating:
+    """Tests for the once-only, own-ride rating update and the driver's average."""
+
+    async def test_repeat_rating_is_not_counted_twice(self):
+        ride_id, rider_id, driver_id = await _completed_ride()
+        assert await add_ride_rating(ride_id, 4, rider_id)
+        assert not await add_ride_rating(ride_id, 1, rider_id)
+        driver = await get_driver(driver_id)
+        assert (driver.total_rides, driver.rating_sum, driver.rating) == (1, 4, 4.0)
+        assert (await get_ride(ride_id, cached=False)).rating == 4
+
+    async def test_other_rider_cannot_rate(self):
+        ride_id, _, driver_id = await _completed_ride()
+        assert not await add_ride_rating(ride_id, 1, next(_user_ids))
+        assert (await get_ride(ride_id, cached=False)).rating is None
+        assert (await get_driver(driver_id)).total_rides == 0
+
+    async def test_unfinished_ride_cannot_be_rated(self):
+        ride_id, rider_id, driver_id = await _assigned_ride()
+        assert not await add_ride_rating(ride_id, 5, rider_id)
+        assert (await get_driver(driver_id)).total_rides == 0
+
+    async def test_average_over_several_ratings(self):
+        driver_id = await _available_driver()
+        for rating in (5, 4, 4):
+            ride_id, rider_id, _ = await _completed_ride(driver_id)
+            assert await add_ride_rating(ride_id, rating, rider_id)
+        driver = await get_driver(driver_id)
+        assert (driver.total_rides, driver.rating_sum) == (3, 13)
+        assert driver.rating == pytest.approx(4.33)
+
+
+# Schema as created before any migrations: ride statuses stored by name in VARCHAR columns
+BASELINE_SCHEMA = """
+CREATE TABLE drivers (
+    id BIGINT PRIMARY KEY, name VARCHAR(50) NOT NULL, phone_number VARCHAR(20),
+    vehicle_type VARCHAR(10) NOT NULL, plate_number VARCHAR(20), license_file_id VARCHAR(255),
+    status VARCHAR(9), available BOOLEAN, latitude FLOAT NOT NULL, longitude FLOAT NOT NULL,
+    rating FLOAT, total_rides INTEGER, wallet_balance FLOAT, language_code VARCHAR(5), created_at DATETIME
+);
+CREATE TABLE riders (
+    id BIGINT PRIMARY KEY, name VARCHAR(50) NOT NULL, phone_number VARCHAR(20),
+    language_code VARCHAR(5), wallet_balance FLOAT, created_at DATETIME
+);
+CREATE TABLE saved_locations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, rider_id BIGINT NOT NULL REFERENCES riders (id),
+    name VARCHAR(50) NOT NULL, latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, created_at DATETIME
+);
+CREATE TABLE rides (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, rider_id BIGINT NOT NULL REFERENCES riders (id),
+    driver_id BIGINT REFERENCES drivers (id), status VARCHAR(16) NOT NULL,
+    rider_lat FLOAT NOT NULL, rider_lng FLOAT NOT NULL, dest_lat FLOAT, dest_lng FLOAT, distance FLOAT,
+    estimated_fare FLOAT, estimated_duration INTEGER, final_fare FLOAT, payment_method VARCHAR(20),
+    rating INTEGER, created_at DATETIME, completed_at DATETIME
+);
+CREATE TABLE ride_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, ride_id INTEGER NOT NULL REFERENCES rides (id),
+    status VARCHAR(16) NOT NULL, timestamp DATETIME
+);
+INSERT INTO drivers (id, name, vehicle_type, status, available, latitude, longitude, rating, total_rides)
+    VALUES (1, 'Driver', 'CAR', 'APPROVED', 0, 9.03, 38.75, 4.5, 2);
+INSERT INTO riders (id, name) VALUES (2, 'Rider');
+INSERT INTO rides (id, rider_id, driver_id, status, rider_lat, rider_lng)
+    VALUES (1, 2, 1, 'COMPLETED', 9.03, 38.75), (2, 2, 1, 'ASSIGNED', 9.03, 38.75);
+INSERT INTO ride_history (ride_id, status)
+    VALUES (1, 'REQUESTED'), (1, 'COMPLETED'), (2, 'REQUESTED'), (2, 'ASSIGNED');
+"""
+
+
+class TestMigration:
+    """Tests for init_db upgrading a database created with the baseline schema."""
+
+    @pytest.fixture
+    async def baseline_db(self, tmp_path, monkeypatch):
+        path = tmp_path / "baseline.db"
+        with sqlite3.connect(path) as conn:
+            conn.executescript(BASELINE_SCHEMA)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        monkeypatch.setattr(db, "engine", engine)
+        monkeypatch.setattr(db, "async_session_maker", async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        ))
+        monkeypatch.setattr(db, "MIGRATION_LOCK_FILE", str(tmp_path / "migrate.lock"))
+        yield path
+        await engine.dispose()
+
+    async def test_statuses_become_codes(self, baseline_db):
+        await init_db()
+        with sqlite3.connect(baseline_db) as conn:
+            rides = conn.execute("SELECT status FROM rides ORDER BY id").fetchall()
+            history = conn.execute("SELECT status FROM ride_history ORDER BY id").fetchall()
+            rating_sum = conn.execute("SELECT rating_sum FROM drivers WHERE id = 1").fetchone()
+            indexes = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        # The converted columns keep TEXT affinity on SQLite, so codes may read back as '5'
+        assert [int(status) for status, in rides] == [5, 2]
+        assert [int(status) for status, in history] == [1, 5, 1, 2]
+        assert rating_sum == (9,)
+        assert {"ix_rides_status_active", "ix_ride_rider_status", "ix_drivers_available"} <= indexes
+        assert await get_schema_version() == SCHEMA_VERSION
+
+    async def test_lookups_read_migrated_rows(self, baseline_db):
+        await init_db()
+        assert (await get_ride(1, cached=False)).status == RideStatus.COMPLETED
+        active = await get_active_ride_for_rider(2)
+        assert active.id == 2 and active.status == RideStatus.ASSIGNED
+
+    async def test_second_run_is_a_no_op(self, baseline_db):
+        await init_db()
+        await init_db()
+        with sqlite3.connect(baseline_db) as conn:
+            rides = conn.execute("SELECT status FROM rides ORDER BY id").fetchall()
+        assert [int(status) for status, in rides] == [5, 2]
+        assert await get_schema_version() == SCHEMA_VERSION
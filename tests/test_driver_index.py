@@ -0,0 +1,75 @@
+"""
+Unit tests for the in-memory available-driver index.
+Tests bounding-box filtering, ordering, grid buckets, local mutations, and reload races.
+"""
+import random
+from unittest.mock import patch
+from database.driver_index import AvailableDriverIndex, DriverPosition, nearest_in_box
+from enums import VehicleType
+
+
+def _driver(driver_id, lat, lng):
+    return DriverPosition(driver_id, f"d{driver_id}", VehicleType.CAR, lat, lng)
+
+
+class TestAvailableDriverIndex:
+    """Tests for AvailableDriverIndex behaviour."""
+
+    def test_candidates_filtered_and_sorted(self):
+        index = AvailableDriverIndex(ttl=30)
+        index.load([_driver(1, 9.05, 38.76), _driver(2, 9.031, 38.751), _driver(3, 9.5, 38.75)], 0)
+        ids = [d.id for d in index.candidates(9.03, 38.75, radius_km=10)]
+        assert ids == [2, 1]
+
+    def test_limit(self):
+        index = AvailableDriverIndex(ttl=30)
+        index.load([_driver(i, 9.03 + i * 0.001, 38.75) for i in range(5)], 0)
+        assert len(index.candidates(9.03, 38.75, radius_km=10, limit=2)) == 2
+
+    def test_add_discard_move(self):
+        index = AvailableDriverIndex(ttl=30)
+        index.add(_driver(1, 9.03, 38.75))
+        index.move(1, 9.5, 38.75)
+        assert index.candidates(9.03, 38.75, radius_km=10) == []
+        index.move(1, 9.03, 38.75)
+        assert [d.id for d in index.candidates(9.03, 38.75, radius_km=10)] == [1]
+        index.discard(1)
+        assert len(index) == 0
+
+    def test_grid_matches_full_scan(self):
+        rng = random.Random(7)
+        drivers = [_driver(i, rng.uniform(8.5, 9.5), rng.uniform(38.2, 39.2)) for i in range(500)]
+        index = AvailableDriverIndex(ttl=30)
+        index.load(drivers, 0)
+        for _ in range(20):
+            lat, lng = rng.uniform(8.7, 9.3), rng.uniform(38.4, 39.0)
+            expected = nearest_in_box(drivers, lat, lng, radius_km=10, limit=20)
+            assert index.candidates(lat, lng, radius_km=10) == expected
+
+    def test_move_across_buckets(self):
+        index = AvailableDriverIndex(ttl=30)
+        index.load([_driver(1, 9.03, 38.75), _driver(2, 10.5, 40.0)], 0)
+        index.move(1, 10.5, 40.01)
+        assert index.candidates(9.03, 38.75, radius_km=10) == []
+        assert [d.id for d in index.candidates(10.5, 40.0, radius_km=10)] == [2, 1]
+        index.discard(1)
+        index.discard(2)
+        assert not index._cells
+
+    def test_freshness_expires(self):
+        index = AvailableDriverIndex(ttl=10)
+        assert not index.is_fresh()
+        with patch("database.driver_index.time.monotonic", return_value=100.0):
+            index.load([], index.generation)
+        with patch("database.driver_index.time.monotonic", return_value=105.0):
+            assert index.is_fresh()
+        with patch("database.driver_index.time.monotonic", return_value=111.0):
+            assert not index.is_fresh()
+
+    def test_load_ignored_after_concurrent_write(self):
+        index = AvailableDriverIndex(ttl=30)
+        generation = index.generation
+        index.add(_driver(1, 9.03, 38.75))  # write lands while the snapshot is in flight
+        index.load([], generation)
+        assert not index.is_fresh()
+        assert len(index) == 1
@@ -0,0 +1,78 @@
+"""
+Handler tests for background sends queued on the outbox.
+Runs the real callbacks against the SQLite test database with a fake bot that hits a flood limit.
+"""
+import itertools
+import os
+import time
+from functools import partial
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+# Override database to use test DB before importing the db module
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test_rideshare.db"
+
+import pytest
+from telegram.error import RetryAfter
+
+from database.db import (
+    init_db, create_driver, create_rider, create_ride, update_driver_status, set_driver_availability,
+    assign_driver_to_ride, update_ride_status, get_ride,
+)
+from enums import DriverStatus, RideStatus, VehicleType
+from handlers.driver import RIDE_ACTION_PATTERN, complete_ride_callback
+from services.notifications import notify_ride_cancelled
+from services.outbox import outbox
+
+# The test database outlives a run, so start user ids somewhere previous runs didn't use
+_user_ids = itertools.count(time.time_ns() // 1000 + 500_000)
+
+
+@pytest.fixture(autouse=True)
+async def setup_db():
+    await init_db()
+    yield
+
+
+def _flood_limited_bot() -> SimpleNamespace:
+    """Bot whose first send is refused with RetryAfter and the rest succeed."""
+    return SimpleNamespace(send_message=AsyncMock(side_effect=[RetryAfter(0), None]))
+
+
+async def _ongoing_ride():
+    rider_id, driver_id = next(_user_ids), next(_user_ids)
+    await create_rider(rider_id, "Test Rider")
+    await create_driver(driver_id, "Test Driver", VehicleType.CAR, 9.03, 38.75)
+    await update_driver_status(driver_id, DriverStatus.APPROVED)
+    assert await set_driver_availability(driver_id, True)
+    ride = await create_ride(rider_id, 9.03, 38.75)
+    assert await assign_driver_to_ride(ride.id, driver_id, 0.5)
+    assert await update_ride_status(ride.id, RideStatus.ONGOING, expected_status=RideStatus.ASSIGNED)
+    return ride.id, rider_id, driver_id
+
+
+class TestFloodLimitedSends:
+    """Tests that queued sends hitting RetryAfter are retried instead of lost."""
+
+    async def test_payment_prompt_is_retried(self):
+        ride_id, rider_id, driver_id = await _ongoing_ride()
+        bot = _flood_limited_bot()
+        update = SimpleNamespace(
+            callback_query=SimpleNamespace(answer=AsyncMock(), edit_message_text=AsyncMock()),
+            effective_user=SimpleNamespace(id=driver_id),
+        )
+        context = SimpleNamespace(bot=bot, matches=[RIDE_ACTION_PATTERN.match(f"complete_ride_{ride_id}")])
+
+        await complete_ride_callback(update, context)
+        await outbox.flush()
+
+        assert (await get_ride(ride_id, cached=False)).status == RideStatus.AWAITING_PAYMENT
+        assert bot.send_message.await_count == 2
+        assert all(call.kwargs["chat_id"] == rider_id for call in bot.send_message.await_args_list)
+
+    async def test_single_party_cancel_notice_is_retried(self):
+        bot = _flood_limited_bot()
+        driver_id = next(_user_ids)
+        outbox.submit(driver_id, partial(notify_ride_cancelled, bot, driver_id, 1))
+        await outbox.flush()
+        assert bot.send_message.await_count == 2
@@ -0,0 +1,40 @@
+"""
+Unit tests for the location utilities.
+Tests the fast matching distance against the precise geodesic one, and display formatting.
+"""
+import pytest
+from services.location import (
+    calculate_distance, calculate_distance_precise, format_distance, get_location_display
+)
+
+
+class TestCalculateDistance:
+    """Tests for the distance helpers."""
+
+    def test_same_point_is_zero(self):
+        assert calculate_distance(9.03, 38.74, 9.03, 38.74) == 0.0
+
+    @pytest.mark.parametrize("lat2, lng2", [(9.08, 38.74), (9.03, 38.82), (9.12, 38.65)])
+    def test_close_to_geodesic_at_city_scale(self, lat2, lng2):
+        fast = calculate_distance(9.03, 38.74, lat2, lng2)
+        precise = calculate_distance_precise(9.03, 38.74, lat2, lng2)
+        assert fast == pytest.approx(precise, rel=0.01)
+
+    def test_symmetric(self):
+        assert calculate_distance(9.0, 38.7, 9.1, 38.8) == calculate_distance(9.1, 38.8, 9.0, 38.7)
+
+
+class TestDisplayFormatting:
+    """Tests for distance and coordinate display strings."""
+
+    @pytest.mark.parametrize("km, text", [(0.0, "0 m"), (0.9999, "999 m"), (1.0, "1.0 km"), (12.345, "12.3 km")])
+    def test_format_distance(self, km, text):
+        assert format_distance(km) == text
+
+    @pytest.mark.parametrize("lat, lng, text", [
+        (9.03, 38.74, "9.030°N, 38.740°E"),
+        (-9.03, -38.74, "9.030°S, 38.740°W"),
+        (0.0, 0.0, "0.000°N, 0.000°E"),
+    ])
+    def test_location_display_hemispheres(self, lat, lng, text):
+        assert get_location_display(lat, lng) == text
@@ -0,0 +1,109 @@
+"""
+Unit tests for the background per-chat outbox.
+Tests per-chat ordering, failure isolation, worker cleanup, the in-flight cap, flood-wait retries,
+and context isolation.
+"""
+import asyncio
+import contextvars
+from telegram.error import RetryAfter
+from services.outbox import Outbox
+
+_marker = contextvars.ContextVar("marker", default=None)
+
+
+def _recorder(log, item, delay=0.0):
+    async def send():
+        await asyncio.sleep(delay)
+        log.append(item)
+    return send
+
+
+class TestOutbox:
+    """Tests for Outbox behaviour."""
+
+    async def test_sends_to_one_chat_keep_order(self):
+        outbox, log = Outbox(), []
+        outbox.submit(1, _recorder(log, "a", delay=0.01))
+        outbox.submit(1, _recorder(log, "b"))
+        await outbox.flush()
+        assert log == ["a", "b"]
+
+    async def test_chats_send_concurrently(self):
+        outbox, log = Outbox(), []
+        outbox.submit(1, _recorder(log, "slow", delay=0.02))
+        outbox.submit(2, _recorder(log, "fast"))
+        await outbox.flush()
+        assert log == ["fast", "slow"]
+
+    async def test_failure_does_not_block_queue(self):
+        outbox, log = Outbox(), []
+
+        async def boom():
+            raise RuntimeError("send failed")
+
+        outbox.submit(1, boom)
+        outbox.submit(1, _recorder(log, "after"))
+        await outbox.flush()
+        assert log == ["after"]
+
+    async def test_worker_exits_when_drained(self):
+        outbox, log = Outbox(), []
+        outbox.submit(1, _recorder(log, "a"))
+        assert len(outbox) == 1
+        await outbox.flush()
+        assert len(outbox) == 0
+        assert not outbox._workers
+
+    async def test_max_in_flight_bounds_concurrent_sends(self):
+        outbox, running, peak = Outbox(max_in_flight=2), [], []
+
+        async def send():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+        for chat_id in range(5):
+            outbox.submit(chat_id, send)
+        await outbox.flush()
+        assert max(peak) == 2
+
+    async def test_retry_after_waits_then_retries_in_order(self):
+        outbox, log, attempts = Outbox(), [], []
+
+        async def limited():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RetryAfter(0)
+            log.append("a")
+
+        outbox.submit(1, limited)
+        outbox.submit(1, _recorder(log, "b"))
+        await outbox.flush()
+        assert len(attempts) == 2
+        assert log == ["a", "b"]
+
+    async def test_retry_after_does_not_hold_a_slot(self):
+        outbox, log, attempts = Outbox(max_in_flight=1), [], []
+
+        async def limited():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RetryAfter(0.05)
+            log.append("limited")
+
+        outbox.submit(1, limited)
+        outbox.submit(2, _recorder(log, "other"))
+        await outbox.flush()
+        assert log == ["other", "limited"]
+
+    async def test_sends_do_not_inherit_caller_context(self):
+        outbox, seen = Outbox(), []
+
+        async def send():
+            seen.append(_marker.get())
+
+        _marker.set("update-scope")
+        outbox.submit(1, send)
+        await outbox.flush()
+        assert seen == [None]
@@ -0,0 +1,49 @@
+"""
+In-process caching utilities for the Rideshare Bot.
+Keeps hot, rarely-changing rows (drivers, riders) in memory for a short time.
+"""
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Minimal dict-backed cache whose entries expire `ttl` seconds after being set.
+
+    Designed for single-threaded asyncio use, so no locking is needed.
+    When full, the oldest entry is evicted first.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the oldest entry if the cache is full."""
+        self._data.pop(key, None)
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        """Invalidate a single key."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Invalidate everything."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
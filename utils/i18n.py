@@ -3,23 +3,33 @@ i18n utility for the Rideshare Bot.
 Handles message translation based on user language preference.
 """
 import json
-import os
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict
 from utils.logger import logger
 
 # Cache for translations
 _translations: Dict[str, Dict[str, str]] = {}
+# Per-language key -> template with the English fallback already merged in,
+# so t() resolves a message with a single lookup
+_templates: Dict[str, Dict[str, str]] = {}
 LOCALES_DIR = "locales"
 
+
+def _build_templates():
+    english = _translations.get("en", {})
+    _templates.clear()
+    for lang_code, strings in _translations.items():
+        _templates[lang_code] = {**english, **strings}
+
 def load_translations():
-    """Load all translation files from the locales directory."""
-    global _translations
+    """
+    Load all translation files from the locales directory.
+    Runs once when this module is imported; t() assumes it already has.
+    """
     try:
-        for filename in os.listdir(LOCALES_DIR):
-            if filename.endswith(".json"):
-                lang_code = filename.split(".")[0]
-                with open(os.path.join(LOCALES_DIR, filename), "r", encoding="utf-8") as f:
-                    _translations[lang_code] = json.load(f)
+        for path in Path(LOCALES_DIR).glob("*.json"):
+            _translations[path.stem] = json.loads(path.read_bytes())
+        _build_templates()
         logger.info(f"Loaded translations for: {', '.join(_translations.keys())}")
     except Exception as e:
         logger.error(f"Failed to load translations: {e}")
@@ -29,11 +39,10 @@ def t(key: str, lang: str = "en", **kwargs) -> str:
     Translate a string given a key and language code.
     Fallback to English if translation missing.
     """
-    if not _translations:
-        load_translations()
-        
-    lang_translations = _translations.get(lang, _translations.get("en", {}))
-    template = lang_translations.get(key, _translations.get("en", {}).get(key, key))
+    templates = _templates.get(lang) or _templates.get("en", {})
+    template = templates.get(key, key)
+    if "{" not in template:
+        return template  # nothing to substitute
     
     try:
         return template.format(**kwargs)
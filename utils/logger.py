@@ -2,8 +2,11 @@
 Logging configuration for the Rideshare Bot.
 Provides structured logging with correlation IDs for production-level debugging.
 """
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from typing import Optional
 from config import LOG_LEVEL
@@ -11,6 +14,9 @@ from config import LOG_LEVEL
 # Create logs directory if it doesn't exist
 LOGS_DIR = Path("logs")
 LOGS_DIR.mkdir(exist_ok=True)
+# Rotate log files instead of letting them grow without bound
+LOG_FILE_MAX_BYTES = 50_000_000
+LOG_FILE_BACKUPS = 5
 
 
 class CorrelationFilter(logging.Filter):
@@ -30,6 +36,10 @@ def setup_logger(name: str = "rideshare_bot") -> logging.Logger:
     """
     Configure and return a logger with both file and console handlers.
     
+    The logger itself only enqueues records; a background QueueListener thread
+    does the formatting and the blocking stdout/file writes, keeping disk I/O
+    off the asyncio event loop.
+    
     Log format: [2026-02-04 10:47:28] [INFO] [ride_id=42] [user_id=123] Message
     """
     logger = logging.getLogger(name)
@@ -53,39 +63,56 @@ def setup_logger(name: str = "rideshare_bot") -> logging.Logger:
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     console_handler.addFilter(correlation_filter)
-    logger.addHandler(console_handler)
     
     # File handler (all logs)
-    file_handler = logging.FileHandler(LOGS_DIR / "rideshare_bot.log")
+    file_handler = RotatingFileHandler(
+        LOGS_DIR / "rideshare_bot.log", maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
     file_handler.addFilter(correlation_filter)
-    logger.addHandler(file_handler)
     
     # Error file handler (errors only)
-    error_handler = logging.FileHandler(LOGS_DIR / "errors.log")
+    error_handler = RotatingFileHandler(
+        LOGS_DIR / "errors.log", maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS
+    )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
     error_handler.addFilter(correlation_filter)
-    logger.addHandler(error_handler)
+    
+    # Hand records to the writer thread; respect_handler_level keeps the per-handler levels above
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(
+        log_queue, console_handler, file_handler, error_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)  # flush anything still queued on shutdown
     
     return logger
 
 
-def log_with_context(logger: logging.Logger, level: str, message: str, 
+def log_with_context(logger: logging.Logger, level: str, message: str, *args,
                      ride_id: Optional[int] = None, user_id: Optional[int] = None):
     """
     Log a message with correlation context.
     
+    Extra positional args are %-formatted into `message` by logging itself, only
+    if the record is actually emitted.
+    
     Example:
-        log_with_context(logger, "INFO", "Driver accepted ride", ride_id=42, user_id=123)
-        Output: [INFO] [ride_id=42] [user_id=123] Driver accepted ride
+        log_with_context(logger, "INFO", "Driver %s accepted ride", "Abe", ride_id=42, user_id=123)
+        Output: [INFO] [ride_id=42] [user_id=123] Driver Abe accepted ride
     """
+    levelno = logging.getLevelName(level.upper())
+    if not logger.isEnabledFor(levelno):
+        return  # skip building the record for filtered-out levels
     extra = {
         'ride_id': ride_id or '-',
         'user_id': user_id or '-'
     }
-    getattr(logger, level.lower())(message, extra=extra)
+    logger.log(levelno, message, *args, extra=extra)
 
 
 # Create default logger instance
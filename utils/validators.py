@@ -3,9 +3,16 @@ Input validation utilities for the Rideshare Bot.
 Ensures data integrity and provides user-friendly error messages.
 """
 import re
+from functools import lru_cache
 from typing import Tuple
 
+_NAME_RE = re.compile(r"^[\w\s\-']+$")  # str patterns are Unicode-aware by default
+_PHONE_SEPARATORS_RE = re.compile(r'[\s\-\(\)]')
+# C0 and C1 control characters, deleted by str.translate in one C-level pass
+_CONTROL_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
 
+
+@lru_cache(maxsize=4096)  # pure, and re-run on the same text when registration steps are retried
 def validate_name(name: str) -> Tuple[bool, str]:
     """
     Validate user/driver name.
@@ -24,7 +31,7 @@ def validate_name(name: str) -> Tuple[bool, str]:
         return False, "Name must be less than 50 characters."
     
     # Allow letters (any language), spaces, hyphens, apostrophes
-    if not re.match(r"^[\w\s\-']+$", name, re.UNICODE):
+    if not _NAME_RE.match(name):
         return False, "Name can only contain letters, spaces, hyphens, and apostrophes."
     
     return True, ""
@@ -43,7 +50,7 @@ def validate_phone_number(phone: str) -> Tuple[bool, str]:
         (is_valid, error_message)
     """
     # Remove spaces, dashes, and parentheses
-    cleaned = re.sub(r'[\s\-\(\)]', '', phone)
+    cleaned = _PHONE_SEPARATORS_RE.sub('', phone)
     
     if not cleaned:
         return False, "Phone number cannot be empty."
@@ -78,7 +85,7 @@ def normalize_phone_number(phone: str) -> str:
     Normalize phone number to international format.
     Converts 09XX to +251 9XX format.
     """
-    cleaned = re.sub(r'[\s\-\(\)]', '', phone)
+    cleaned = _PHONE_SEPARATORS_RE.sub('', phone)
     
     if cleaned.startswith('09') or cleaned.startswith('07'):
         return '+251' + cleaned[1:]
@@ -130,7 +137,7 @@ def sanitize_input(text: str, max_length: int = 200) -> str:
         Sanitized text
     """
     # Remove any control characters
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
+    text = text.translate(_CONTROL_CHARS_TABLE)
     
     # Trim to max length
     text = text[:max_length]